@@ -11,10 +11,21 @@ Run >> python GeneticAlgorithm.py -h
 '''
 
 import random, os, sys, pickle, math, copy
-import logging, argparse, imp
+import logging, argparse, imp, inspect
+import multiprocessing, collections, bisect, heapq, functools
+import multiprocessing.pool
+import threading, Queue
+import multiprocessing.managers
+import time, json, csv, struct, hashlib
 logging.basicConfig(format='%(levelname)s:%(message)s', level=logging.DEBUG)
 import sqlite3
 
+try:
+    import numpy as np
+    useNumpy = True
+except:
+    useNumpy = False
+
 try:
     import progressbar
     useProgressBar = True
@@ -25,19 +36,1457 @@ except:
 options = []
 
 
+# fitness function loaded once per worker process by _initWorker
+_workerFitnessFunc = None
+
+
+def _initWorker(fitnessFile, funcName):
+    '''
+    initializer of worker processes: load the user's fitness function module once per worker
+    '''
+    global _workerFitnessFunc
+    _workerFitnessFunc = getattr(imp.load_source('fitnessFunc', fitnessFile), funcName)
+    return
+
+
+def _seedGlobals(evalSeed):
+    '''
+    seed the global random and numpy.random generators used by the fitness function
+    with the sub-stream of a single evaluation (see Simulator._evalSeeds(...)), unless None
+    '''
+    if evalSeed is None:
+        return
+    random.seed(evalSeed)
+    if useNumpy:
+        np.random.seed(_seedWords(evalSeed))
+    return
+
+
+def _deriveSeed(seed, *keys):
+    '''
+    seed of an independent random number sub-stream identified by keys (e.g. 'island', 2),
+    derived from the root seed by hashing, so that sub-streams do not depend on the order
+    in which they are spawned
+    '''
+    return int(hashlib.sha256(repr((seed,) + keys)).hexdigest()[:32], 16)
+
+
+def _seedWords(seed):
+    '''
+    split a 128-bit seed into 32-bit words, as taken by numpy.random.RandomState
+    '''
+    return [(seed >> (32 * i)) & 0xffffffff for i in xrange(4)]
+
+
+def _makeRngs(seed):
+    '''
+    return a random.Random obj and a numpy.random.RandomState obj (None without numpy)
+    seeded with independent sub-streams of seed, or the global random and numpy.random
+    modules if seed is None
+    '''
+    if seed is None:
+        return random, np.random if useNumpy else None
+    rng = random.Random(_deriveSeed(seed, 'random'))
+    npRng = np.random.RandomState(_seedWords(_deriveSeed(seed, 'numpy'))) if useNumpy else None
+    return rng, npRng
+
+
+def _workerFitness(task, fidelity=None):
+    '''
+    evaluate the fitness of a single parameter combination within a worker process,
+    task being the parameter combination and the seed of its evaluation
+    '''
+    parDict, evalSeed = task
+    return _callFitness(_workerFitnessFunc, parDict, fidelity, evalSeed)
+
+
+def _workerFitnessBatch(task, fidelity=None):
+    '''
+    evaluate the fitness of a chunk of parameter combinations within a worker process,
+    task being the chunk and the seed of its evaluation
+    '''
+    parDicts, evalSeed = task
+    return _callFitnessBatch(_workerFitnessFunc, parDicts, fidelity, evalSeed)
+
+
+def _fidelityArgs(fidelity):
+    '''
+    keyword arguments of the fitness function, 'fidelity' in multi-fidelity mode
+    '''
+    return {} if fidelity is None else {'fidelity': fidelity}
+
+
+def _callFitness(fitnessFunc, parDict, fidelity=None, evalSeed=None):
+    _seedGlobals(evalSeed)
+    try:
+        return fitnessFunc(parDict, **_fidelityArgs(fidelity))
+    except Exception, e:
+        print e
+        raise ValueError(_fitnessErrorMessage(parDict))
+
+
+def _callFitnessBatch(fitnessFuncBatch, parDicts, fidelity=None, evalSeed=None):
+    _seedGlobals(evalSeed)
+    try:
+        fitness = list(fitnessFuncBatch(parDicts, **_fidelityArgs(fidelity)))
+    except Exception, e:
+        print e
+        raise ValueError("Check Input! Batch fitness function fails to run on %d parameter combinations!" % len(parDicts))
+    if len(fitness) != len(parDicts):
+        raise ValueError("Batch fitness function need to return one fitness value per parameter combination")
+    return fitness
+
+
+def _callFitnessArray(fitnessFuncArray, columns, numInd, fidelity=None, evalSeed=None):
+    _seedGlobals(evalSeed)
+    try:
+        fitness = np.asarray(fitnessFuncArray(columns, **_fidelityArgs(fidelity)), dtype=float)
+    except Exception, e:
+        print e
+        raise ValueError("Check Input! Array fitness function fails to run on %d parameter combinations!" % numInd)
+    if fitness.shape == ():
+        fitness = np.repeat(fitness, numInd)
+    if fitness.ndim not in (1, 2) or len(fitness) != numInd:
+        raise ValueError("Array fitness function need to return an array of one fitness value (or one row of objective values) per parameter combination")
+    return fitness
+
+
+def _fitnessList(fitness):
+    '''
+    list of fitness values of an array returned by _callFitnessArray(...), tuples of objective values if it has rows
+    '''
+    if fitness.ndim == 2:
+        return [tuple(row) for row in fitness.tolist()]
+    return fitness.tolist()
+
+
+def _valueArray(values):
+    '''
+    numpy array of parameter values, of object dtype unless all values are numbers
+    '''
+    try:
+        array = np.array(values)
+        if array.ndim == 1 and array.dtype.kind in 'biuf':
+            return array
+    except Exception:
+        pass
+    array = np.empty(len(values), dtype=object)
+    for idx, value in enumerate(values):
+        array[idx] = value
+    return array
+
+
+def _parKey(parDict):
+    '''
+    canonical, hashable representation of a parameter combination
+    '''
+    return repr(sorted(parDict.items()))
+
+
+def _fitnessFingerprint(fitnessFunc, fidelity=None):
+    '''
+    fingerprint of the fitness function whose values are cached: hash of the source
+    file defining it, its name and the full fidelity level (in multi-fidelity mode)
+    '''
+    digest = hashlib.sha256()
+    try:
+        with open(inspect.getsourcefile(fitnessFunc), 'rb') as fi:
+            digest.update(fi.read())
+    except (TypeError, IOError):
+        digest.update(repr(getattr(fitnessFunc, '__module__', None)))
+    digest.update(repr((getattr(fitnessFunc, '__name__', repr(fitnessFunc)), fidelity)))
+    return digest.hexdigest()
+
+
+def _sqlValue(value):
+    '''
+    value as stored in sqlite, in text form unless it is a number or a string
+    '''
+    if isinstance(value, (bool, int, long, float, basestring)) or value is None:
+        return value
+    return str(value)
+
+
+def _fitnessErrorMessage(parDict):
+    return "Check Input! Fitness function fails to run on the following parameter combination!\n%s" % '\n'.join(["{} = {}".format(i,j) for i,j in zip(parDict.keys(), parDict.values())])
+
+
+def _atomicWrite(fileName, writeFunc, mode='wb'):
+    '''
+    call writeFunc on a temporary file object and rename it to fileName when done,
+    so that fileName is never left truncated by a crash
+    '''
+    tmpFile = fileName + '.tmp'
+    with open(tmpFile, mode) as fi:
+        writeFunc(fi)
+        fi.flush()
+        os.fsync(fi.fileno())
+    try:
+        os.rename(tmpFile, fileName)
+    except OSError:  # rename does not overwrite on Windows
+        os.remove(fileName)
+        os.rename(tmpFile, fileName)
+    return
+
+
+class BackgroundWriter():
+    '''
+    run file writing jobs one at a time in a background thread. An error of a job
+    is raised by the next call to submit(...) or close()
+    '''
+    def __init__(self):
+        self.queue = Queue.Queue(maxsize=1)
+        self.error = None
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+        return
+    
+    
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            func, args = job
+            try:
+                func(*args)
+            except Exception, e:
+                self.error = e
+        return
+    
+    
+    def _raiseError(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        return
+    
+    
+    def submit(self, func, *args):
+        '''
+        queue func(*args), waiting for the previous job if it is still pending
+        '''
+        self._raiseError()
+        self.queue.put((func, args))
+        return
+    
+    
+    def close(self):
+        '''
+        wait for all queued jobs to finish
+        '''
+        self.queue.put(None)
+        self.thread.join()
+        self._raiseError()
+        return
+
+
+class StopCriteria():
+    '''
+    criteria to stop evolving early, checked on statistics of each generation
+    (see Simulator._genStats(...)). Each criterion is disabled if set to None.
+    '''
+    def __init__(self, stagnation=None, targetFitness=None, timeLimit=None, maxEvals=None, minDiversity=None):
+        '''
+        Args:
+            stagnation -- stop if the best fitness (of any objective) has not improved for this many generations
+            targetFitness -- stop once a fitness value <= targetFitness is found, or for multiple
+                objectives once each is <= targetFitness (a number or a tuple of one per objective)
+            timeLimit -- stop once this many seconds have elapsed
+            maxEvals -- stop once the fitness function has been called this many times (counting
+                calls below full fidelity as fractions, see Simulator argument 'fidelities')
+            minDiversity -- stop once the fraction of distinct genotypes in the population drops below this
+        '''
+        self.stagnation = stagnation
+        self.targetFitness = targetFitness
+        self.timeLimit = timeLimit
+        self.maxEvals = maxEvals
+        self.minDiversity = minDiversity
+        
+        self.bestEver, self.numStagnantGen = None, 0
+        return
+    
+    
+    def __call__(self, stats):
+        '''
+        return the reason to stop evolving after the generation of 'stats', or None to go on
+        '''
+        # best fitness of each objective of multi-objective fitness
+        bestEver = _objectives(stats['bestEver'])
+        if self.bestEver is None or any([a < b for a, b in zip(bestEver, self.bestEver)]):
+            self.bestEver = bestEver if self.bestEver is None else tuple(map(min, bestEver, self.bestEver))
+            self.numStagnantGen = 0
+        else:
+            self.numStagnantGen += 1
+        #
+        targets = _objectives(self.targetFitness)
+        if self.targetFitness is not None and all([a <= b for a, b in zip(bestEver, targets * len(bestEver) if len(targets) == 1 else targets)]):
+            return "target fitness %s reached" % self.targetFitness
+        if self.stagnation is not None and self.numStagnantGen >= self.stagnation:
+            return "best fitness has not improved for %d generations" % self.numStagnantGen
+        if self.timeLimit is not None and stats['elapsed'] >= self.timeLimit:
+            return "time limit of %s seconds reached" % self.timeLimit
+        if self.maxEvals is not None and stats['totalEvaluations'] >= self.maxEvals:
+            return "%g fitness evaluations reached the limit" % stats['totalEvaluations']
+        if self.minDiversity is not None and stats['diversity'] < self.minDiversity:
+            return "population diversity %.4f dropped below %s" % (stats['diversity'], self.minDiversity)
+        return None
+    
+    
+    def getstate(self):
+        '''
+        snapshot of the best fitness so far and number of stagnant generations, e.g. for checkpoints
+        '''
+        return self.bestEver, self.numStagnantGen
+    
+    
+    def setstate(self, state):
+        self.bestEver, self.numStagnantGen = state
+        return
+    
+
+class AdaptiveRates():
+    '''
+    control of the probabilities of crossover and mutation during a run: a schedule from
+    their initial values (probCross and probMut of Simulator.evolve(...)) to final values,
+    a mutation boost while the population has collapsed, and optionally self-adaptive
+    mutation rates carried by each individual
+    '''
+    def __init__(self, schedule='constant', finalCross=None, finalMut=None, minDiversity=None, boost=2., selfAdaptive=False, tau=0.2):
+        '''
+        Args:
+            schedule -- 'constant', 'linear' or 'exponential' decay (or growth) of the
+                probabilities from their initial values at generation 1 to their final
+                values at the last generation (default:'constant')
+            finalCross -- probability of crossover at the last generation, the initial
+                one if not given (default:None)
+            finalMut -- probability of mutation at the last generation, the initial one
+                if not given (default:None)
+            minDiversity -- multiply the probability of mutation by 'boost' while the fraction
+                of distinct genotypes in the population is below this (default:None, no boost)
+            boost -- factor of the diversity-triggered mutation boost (default:2.)
+            selfAdaptive -- if True, each individual carries a factor of the probability of
+                mutation of its offspring, inherited as the geometric mean of its parents' and
+                perturbed log-normally, so that rates producing fitter offspring spread (default:False)
+            tau -- standard deviation of the log-normal perturbation of self-adaptive factors (default:0.2)
+        '''
+        if schedule not in ('constant', 'linear', 'exponential'):
+            raise ValueError("Unknown schedule of crossover and mutation rates '%s'" % schedule)
+        self.schedule = schedule
+        self.finalCross = finalCross
+        self.finalMut = finalMut
+        self.minDiversity = minDiversity
+        self.boost = boost
+        self.selfAdaptive = selfAdaptive
+        self.tau = tau
+        return
+    
+    
+    def __call__(self, gen, numGen, probCross, probMut, diversity):
+        '''
+        return the probabilities of crossover and mutation of generation 'gen' of 'numGen',
+        given their initial values and the diversity of the population being bred
+        '''
+        fraction = (gen - 1) / float(max(1, numGen - 1))
+        probCross = self._schedule(probCross, self.finalCross, fraction)
+        probMut = self._schedule(probMut, self.finalMut, fraction)
+        if self.minDiversity is not None and diversity < self.minDiversity:
+            probMut = min(1., probMut * self.boost)
+        return probCross, probMut
+    
+    
+    def _schedule(self, initial, final, fraction):
+        if final is None or self.schedule == 'constant':
+            return initial
+        if self.schedule == 'linear':
+            return initial + (final - initial) * fraction
+        if initial <= 0 or final <= 0:
+            raise ValueError("Exponential schedule requires positive initial and final rates")
+        return initial * (final / float(initial)) ** fraction
+    
+    
+    def childFactors(self, factors1, factors2, rng=random):
+        '''
+        self-adaptive mutation factors of offspring of parents with factors1[i] and factors2[i]
+        '''
+        return [min(100., max(0.01, math.sqrt(f1 * f2) * math.exp(self.tau * rng.gauss(0., 1.)))) for f1, f2 in zip(factors1, factors2)]
+    
+
+class FitnessCache():
+    '''
+    memoize fitness values keyed on the decoded parameter combination, with an
+    optional LRU bound on the number of values kept in memory and an optional
+    sqlite file that persists values across runs
+    '''
+    def __init__(self, maxSize=0, dbFile=None):
+        '''
+        Args:
+            maxSize -- max number of fitness values kept in memory, 0 for unbounded (default:0)
+            dbFile -- sqlite file to load and save fitness values. Values are kept
+                in memory only if not given (default:None)
+        '''
+        self.maxSize = maxSize
+        self.values = collections.OrderedDict()
+        self.hits, self.misses = 0, 0
+        
+        self.connection = None
+        if dbFile:
+            self.connection = sqlite3.connect(dbFile)
+            self.connection.execute("CREATE TABLE IF NOT EXISTS fitness (pars TEXT PRIMARY KEY, fitness REAL)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.fingerprint = None  # fingerprint of the fitness function of cached values
+        
+        return
+    
+    
+    def bind(self, fingerprint):
+        '''
+        bind the cache to the fitness function of fingerprint (see _fitnessFingerprint(...)).
+        Values cached for a different fitness function, or by a sqlite file of unknown
+        origin, are cleared.
+        '''
+        stored = self.fingerprint
+        if self.connection is not None:
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+            stored = row[0] if row is not None else None
+            if stored is None and self.connection.execute("SELECT COUNT(*) FROM fitness").fetchone()[0] == 0:
+                stored = fingerprint
+        elif not self.values:
+            stored = fingerprint
+        #
+        if stored != fingerprint:
+            logging.warning("Fitness cache holds values of a different fitness function, clear it")
+            self.values.clear()
+            if self.connection is not None:
+                self.connection.execute("DELETE FROM fitness")
+        if self.connection is not None:
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (fingerprint,))
+            self.connection.commit()
+        self.fingerprint = fingerprint
+        return
+    
+    
+    def _remember(self, key, fitness):
+        self.values[key] = fitness
+        if self.maxSize and len(self.values) > self.maxSize:
+            self.values.popitem(last=False)
+        return
+    
+    
+    def __contains__(self, parDict):
+        '''
+        True if fitness of parDict is cached, without counting a hit or miss
+        '''
+        key = _parKey(parDict)
+        if key in self.values:
+            return True
+        return self.connection is not None and self.connection.execute("SELECT 1 FROM fitness WHERE pars = ?", (key,)).fetchone() is not None
+    
+    
+    def get(self, parDict):
+        '''
+        return cached fitness of parDict, or None if it has not been evaluated
+        '''
+        key = _parKey(parDict)
+        if key in self.values:
+            # move to the most recently used end
+            fitness = self.values.pop(key)
+            self.values[key] = fitness
+            self.hits += 1
+            return fitness
+        #
+        if self.connection is not None:
+            row = self.connection.execute("SELECT fitness FROM fitness WHERE pars = ?", (key,)).fetchone()
+            if row is not None:
+                # multi-objective fitness is stored as a JSON list
+                fitness = tuple(json.loads(row[0])) if isinstance(row[0], basestring) else row[0]
+                self._remember(key, fitness)
+                self.hits += 1
+                return fitness
+        #
+        self.misses += 1
+        return None
+    
+    
+    def put(self, parDict, fitness):
+        key = _parKey(parDict)
+        self._remember(key, fitness)
+        if self.connection is not None:
+            value = json.dumps(list(fitness)) if isinstance(fitness, (tuple, list)) else fitness
+            self.connection.execute("INSERT OR REPLACE INTO fitness VALUES (?, ?)", (key, value))
+        return
+    
+    
+    def commit(self):
+        '''
+        write newly cached fitness values to the sqlite file (if any)
+        '''
+        if self.connection is not None:
+            self.connection.commit()
+        return
+    
+    
+    def close(self):
+        if self.connection is not None:
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
+        return
+    
+
+class HistoryDB():
+    '''
+    sqlite database of every evaluated individual of a run, streamed generation by
+    generation in WAL mode so that it can be queried while the run is in progress.
+    Table 'tableName' has columns gen, fitness (or fitness_1, fitness_2, ... for
+    multi-objective fitness) and one column per parameter, typed INTEGER, REAL or
+    TEXT after its first value, and is indexed on fitness and on gen
+    '''
+    def __init__(self, dbFile, tableName='history', fromGen=0):
+        '''
+        Args:
+            dbFile -- sqlite file to write to
+            tableName -- name of the table of evaluated individuals (default:'history')
+            fromGen -- rows of generations >= fromGen left in the table by an earlier
+                run are deleted, so that a resumed run continues its history. The table
+                is recreated if fromGen is 0 (default:0)
+        '''
+        self.tableName = tableName
+        self.pars = None  # parameter columns, set when the table is created
+        self.numObjectives = 0  # number of objectives of multi-objective fitness, 0 for scalar fitness
+        self.connection = sqlite3.connect(dbFile)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            if fromGen == 0:
+                self.connection.execute('DROP TABLE IF EXISTS "%s"' % tableName)
+            else:
+                columns = [row[1] for row in self.connection.execute('PRAGMA table_info("%s")' % tableName)]
+                if columns:
+                    while 1+self.numObjectives < len(columns) and columns[1+self.numObjectives] == 'fitness_%d' % (self.numObjectives+1):
+                        self.numObjectives += 1
+                    self.pars = columns[1+max(1, self.numObjectives):]
+                    self.connection.execute('DELETE FROM "%s" WHERE gen >= ?' % tableName, (fromGen,))
+        return
+    
+    
+    def _createTable(self, row, fitness):
+        '''
+        create the table with parameter columns typed after the values of dict row, and
+        fitness columns after the fitness value
+        '''
+        self.pars = sorted(row.keys())
+        self.numObjectives = len(fitness) if isinstance(fitness, (tuple, list)) else 0
+        fitnessCols = ['fitness_%d' % (obj+1) for obj in xrange(self.numObjectives)] or ['fitness']
+        columns = ['gen INTEGER'] + ['%s REAL' % col for col in fitnessCols]
+        for par in self.pars:
+            if type(row[par]) in (bool, int, long):
+                columns.append('"%s" INTEGER' % par)
+            elif type(row[par]) is float:
+                columns.append('"%s" REAL' % par)
+            else:
+                columns.append('"%s" TEXT' % par)
+        self.connection.execute('CREATE TABLE "%s" (%s)' % (self.tableName, ', '.join(columns)))
+        for col in fitnessCols:
+            self.connection.execute('CREATE INDEX "%s_%s" ON "%s" (%s)' % (self.tableName, col, self.tableName, col))
+        self.connection.execute('CREATE INDEX "%s_gen" ON "%s" (gen)' % (self.tableName, self.tableName))
+        return
+    
+    
+    def add(self, gen, parDicts, fitness):
+        '''
+        insert parameter combinations evaluated in generation 'gen' and their fitness values in one transaction
+        '''
+        if not parDicts:
+            return
+        with self.connection:
+            if self.pars is None:
+                self._createTable(parDicts[0], fitness[0])
+            sql = 'INSERT INTO "%s" VALUES (%s)' % (self.tableName, ', '.join(['?'] * (len(self.pars) + 1 + max(1, self.numObjectives))))
+            self.connection.executemany(sql, ([gen] + list(_objectives(fit)) + [_sqlValue(parDict[par]) for par in self.pars] for parDict, fit in zip(parDicts, fitness)))
+        return
+    
+    
+    def addColumns(self, gen, columns, fitness):
+        '''
+        insert parameter combinations given as a dict of numpy arrays (one per parameter,
+        or a single value of a fixed parameter), evaluated in generation 'gen', and their
+        list of fitness values in one transaction
+        '''
+        numInd = len(fitness)
+        columns = dict((par, values.tolist() if isinstance(values, np.ndarray) else [values] * numInd) for par, values in columns.items())
+        if not numInd:
+            return
+        with self.connection:
+            if self.pars is None:
+                self._createTable(dict((par, values[0]) for par, values in columns.items()), fitness[0])
+            sql = 'INSERT INTO "%s" VALUES (%s)' % (self.tableName, ', '.join(['?'] * (len(self.pars) + 1 + max(1, self.numObjectives))))
+            rows = zip([gen] * numInd, fitness, *[columns[par] for par in self.pars])
+            self.connection.executemany(sql, ([row[0]] + list(_objectives(row[1])) + [_sqlValue(value) for value in row[2:]] for row in rows))
+        return
+    
+    
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        return
+    
+
+class TopFitArchive():
+    '''
+    bounded archive of the 'maxSize' fittest (smallest fitness) distinct parameter
+    combinations, kept in a heap with the least fit entry on top and a set of
+    canonical parameter keys for duplicate checks
+    '''
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self.heap = []  # entries of (-fitness, -order of insertion, parDict key, parDict)
+        self.keys = set()
+        self.count = 0
+        return
+    
+    
+    def __len__(self):
+        return len(self.heap)
+    
+    
+    def add(self, parDict, fitness, key=None):
+        '''
+        add a parameter combination if it is not in the archive and fitter than the
+        least fit one, which is dropped if the archive is full. Return True if added.
+        '''
+        if isinstance(fitness, (tuple, list)):
+            raise ValueError("Fitness function returns multiple objectives, which need selection strategy 'nsga2'")
+        if key is None:
+            key = _parKey(parDict)
+        if key in self.keys or self.maxSize <= 0:
+            return False
+        # among ties the entry added first is dropped first
+        self.count += 1
+        entry = (-fitness, self.count, key, parDict)
+        if len(self.heap) < self.maxSize:
+            heapq.heappush(self.heap, entry)
+        elif fitness < self.worst():
+            self.keys.discard(heapq.heapreplace(self.heap, entry)[2])
+        else:
+            return False
+        self.keys.add(key)
+        return True
+    
+    
+    def sorted(self):
+        '''
+        return lists of fitness values and parameter combinations in the archive, fittest first
+        '''
+        entries = sorted(self.heap, key=lambda entry: (-entry[0], entry[1]))
+        return [-entry[0] for entry in entries], [entry[3] for entry in entries]
+    
+    
+    def worst(self):
+        '''
+        return the fitness value of the least fit entry
+        '''
+        return -self.heap[0][0]
+    
+    
+    def items(self):
+        '''
+        return a list of (fitness, parDict) entries in order of insertion, from which
+        the archive is rebuilt by adding them in order (e.g. saved in checkpoints)
+        '''
+        return [(-entry[0], entry[3]) for entry in sorted(self.heap, key=lambda entry: entry[1])]
+    
+    
+    def copy(self):
+        '''
+        return a snapshot of the archive
+        '''
+        archive = TopFitArchive(self.maxSize)
+        archive.heap, archive.keys, archive.count = list(self.heap), set(self.keys), self.count
+        return archive
+    
+
+class ContinuousParam():
+    '''
+    real-valued parameter taking any value within [lower, upper], specified as
+    x=(lower, upper) in config files. Its gene is stored as a float, recombined
+    by simulated binary crossover and mutated by bounded Gaussian mutation
+    '''
+    def __init__(self, lower, upper):
+        if not lower < upper:
+            raise ValueError("lower bound %s of a continuous parameter need to be smaller than its upper bound %s" % (lower, upper))
+        self.lower = float(lower)
+        self.upper = float(upper)
+        return
+    
+    
+    def __repr__(self):
+        return 'ContinuousParam(%r, %r)' % (self.lower, self.upper)
+    
+
+def _sbxBeta(u, eta):
+    '''
+    spread factor of simulated binary crossover with distribution index eta for uniform random number(s) u in [0, 1)
+    '''
+    if useNumpy and isinstance(u, np.ndarray):
+        return np.where(u <= 0.5, (2 * u) ** (1. / (eta + 1)), (0.5 / (1 - u)) ** (1. / (eta + 1)))
+    return (2 * u) ** (1. / (eta + 1)) if u <= 0.5 else (0.5 / (1 - u)) ** (1. / (eta + 1))
+
+
+def _reflect(x, lower, upper):
+    '''
+    reflect value(s) x beyond bounds back into [lower, upper]
+    '''
+    if useNumpy and isinstance(x, np.ndarray):
+        x = np.where(x < lower, 2 * lower - x, x)
+        x = np.where(x > upper, 2 * upper - x, x)
+        return np.clip(x, lower, upper)
+    if x < lower:
+        x = 2 * lower - x
+    if x > upper:
+        x = 2 * upper - x
+    return min(max(x, lower), upper)
+
+
+def _objectives(fitness):
+    '''
+    tuple of objective values of a (scalar or multi-objective) fitness value
+    '''
+    return tuple(fitness) if isinstance(fitness, (tuple, list)) else (fitness,)
+
+
+def _dominates(objectives1, objectives2):
+    '''
+    True if objectives1 is no worse than objectives2 in every objective and better in
+    at least one, all objectives being minimized
+    '''
+    return all([a <= b for a, b in zip(objectives1, objectives2)]) and objectives1 != objectives2
+
+
+def _nonDominatedRanks(objectives):
+    '''
+    fast non-dominated sorting (NSGA-II) of a list of objective tuples: return the rank
+    of each, 0 for the Pareto front, 1 for the front dominated only by rank 0, and so on
+    '''
+    numInd = len(objectives)
+    dominated = [[] for idx in xrange(numInd)]  # indexes dominated by each individual
+    numDominators = [0] * numInd
+    if useNumpy and numInd:
+        values = np.array(objectives, dtype=float)
+        for idx in xrange(numInd):
+            dominated[idx] = np.flatnonzero((values[idx] <= values).all(1) & (values[idx] < values).any(1)).tolist()
+            for jdx in dominated[idx]:
+                numDominators[jdx] += 1
+    else:
+        for idx in xrange(numInd):
+            for jdx in xrange(idx+1, numInd):
+                if _dominates(objectives[idx], objectives[jdx]):
+                    dominated[idx].append(jdx)
+                    numDominators[jdx] += 1
+                elif _dominates(objectives[jdx], objectives[idx]):
+                    dominated[jdx].append(idx)
+                    numDominators[idx] += 1
+    #
+    ranks = [0] * numInd
+    front = [idx for idx in xrange(numInd) if numDominators[idx] == 0]
+    rank = 0
+    while front:
+        nextFront = []
+        for idx in front:
+            ranks[idx] = rank
+            for jdx in dominated[idx]:
+                numDominators[jdx] -= 1
+                if numDominators[jdx] == 0:
+                    nextFront.append(jdx)
+        front = nextFront
+        rank += 1
+    return ranks
+
+
+def _crowdingDistances(objectives, ranks):
+    '''
+    crowding distance of each objective tuple within its front (individuals of the same
+    rank): the sum over objectives of the normalized gap between its two neighbours,
+    infinite for the boundary individuals of each objective
+    '''
+    distances = [0.] * len(objectives)
+    fronts = collections.defaultdict(list)
+    for idx, rank in enumerate(ranks):
+        fronts[rank].append(idx)
+    for front in fronts.values():
+        for obj in xrange(len(objectives[front[0]])):
+            front.sort(key=lambda idx: objectives[idx][obj])
+            low, high = objectives[front[0]][obj], objectives[front[-1]][obj]
+            distances[front[0]] = distances[front[-1]] = float('inf')
+            if high == low:
+                continue
+            for pos in xrange(1, len(front)-1):
+                distances[front[pos]] += (objectives[front[pos+1]][obj] - objectives[front[pos-1]][obj]) / float(high - low)
+    return distances
+
+
+class ParetoArchive():
+    '''
+    bounded archive of the distinct parameter combinations on the Pareto front of
+    multi-objective fitness values (all objectives minimized) found so far. Entries
+    dominated by a new one are dropped, and the most crowded entry is dropped if the
+    front grows beyond 'maxSize'. Same interface as TopFitArchive.
+    '''
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self.entries = collections.OrderedDict()  # parDict key -> (fitness, parDict), oldest first
+        return
+    
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    
+    def add(self, parDict, fitness, key=None):
+        '''
+        add a parameter combination if it is not in the archive and not dominated by any
+        entry. Return True if it is in the archive afterwards.
+        '''
+        if key is None:
+            key = _parKey(parDict)
+        if key in self.entries or self.maxSize <= 0:
+            return False
+        objectives = _objectives(fitness)
+        for entryKey, (entryFitness, entryParDict) in self.entries.items():
+            if _dominates(_objectives(entryFitness), objectives):
+                return False
+            if _dominates(objectives, _objectives(entryFitness)):
+                del self.entries[entryKey]
+        self.entries[key] = (fitness, parDict)
+        #
+        if len(self.entries) > self.maxSize:
+            keys = self.entries.keys()
+            entryObjectives = [_objectives(entry[0]) for entry in self.entries.values()]
+            distances = _crowdingDistances(entryObjectives, [0] * len(keys))
+            # among ties the entry added first is dropped first
+            dropKey = keys[min(xrange(len(keys)), key=lambda idx: distances[idx])]
+            del self.entries[dropKey]
+            return dropKey != key
+        return True
+    
+    
+    def sorted(self):
+        '''
+        return lists of fitness values and parameter combinations in the archive, sorted by objectives
+        '''
+        entries = sorted(self.entries.values(), key=lambda entry: _objectives(entry[0]))
+        return [entry[0] for entry in entries], [entry[1] for entry in entries]
+    
+    
+    def items(self):
+        '''
+        return a list of (fitness, parDict) entries in order of insertion, see TopFitArchive.items()
+        '''
+        return self.entries.values()
+    
+    
+    def copy(self):
+        '''
+        return a snapshot of the archive
+        '''
+        archive = ParetoArchive(self.maxSize)
+        archive.entries = collections.OrderedDict(self.entries)
+        return archive
+    
+
+def _rankCorrelation(values1, values2):
+    '''
+    Spearman rank correlation of two numpy arrays (ties ranked by order), or None if either is constant
+    '''
+    ranks1, ranks2 = values1.argsort().argsort(), values2.argsort().argsort()
+    if len(values1) < 2 or values1.min() == values1.max() or values2.min() == values2.max():
+        return None
+    return float(np.corrcoef(ranks1, ranks2)[0, 1])
+
+
+class KNNSurrogate():
+    '''
+    k-nearest-neighbour regressor of fitness values (or objective tuples) on genotype
+    features (see GenomeArray.features(...)), trained incrementally on every evaluated
+    individual, which pre-screens offspring: 'oversample' times as many offspring as
+    needed are bred, and only the ones predicted fittest are evaluated by the fitness function
+    '''
+    def __init__(self, k=5, oversample=2., maxSamples=20000):
+        '''
+        Args:
+            k -- number of nearest evaluated individuals whose fitness values are averaged,
+                weighted by inverse distance (default:5)
+            oversample -- number of candidate offspring bred per offspring evaluated (default:2.)
+            maxSamples -- max number of most recently evaluated individuals kept for
+                prediction, 0 for unbounded (default:20000)
+        '''
+        if not useNumpy:
+            raise ValueError("Fail to import 'numpy' module, which is required by the surrogate model")
+        if oversample < 1:
+            raise ValueError("Oversampling factor of the surrogate model need to be >= 1")
+        self.k = k
+        self.oversample = oversample
+        self.maxSamples = maxSamples
+        self.features, self.targets = None, None
+        self.numSamples = 0
+        return
+    
+    
+    def __len__(self):
+        return self.numSamples
+    
+    
+    def add(self, features, fitness):
+        '''
+        add evaluated individuals (rows of features) and their fitness values to the training set
+        '''
+        targets = np.array([_objectives(fit) for fit in fitness], dtype=float).reshape(len(fitness), -1)
+        # failed evaluations (e.g. infinite fitness) are not learned
+        finite = np.isfinite(targets).all(1)
+        features, targets = features[finite], targets[finite]
+        if not len(features):
+            return
+        if self.features is None:
+            self.features = np.empty((max(64, 2 * len(features)), features.shape[1]))
+            self.targets = np.empty((len(self.features), targets.shape[1]))
+        # grow capacity by doubling, or drop the oldest samples beyond maxSamples
+        numSamples = self.numSamples + len(features)
+        if self.maxSamples and numSamples > self.maxSamples:
+            keep = max(0, self.maxSamples - len(features))
+            self.features[:keep] = self.features[self.numSamples-keep:self.numSamples]
+            self.targets[:keep] = self.targets[self.numSamples-keep:self.numSamples]
+            features, targets = features[-self.maxSamples:], targets[-self.maxSamples:]
+            self.numSamples, numSamples = keep, keep + len(features)
+        if numSamples > len(self.features):
+            capacity = max(numSamples, 2 * len(self.features))
+            self.features = np.concatenate([self.features[:self.numSamples], np.empty((capacity - self.numSamples, self.features.shape[1]))])
+            self.targets = np.concatenate([self.targets[:self.numSamples], np.empty((capacity - self.numSamples, self.targets.shape[1]))])
+        self.features[self.numSamples:numSamples] = features
+        self.targets[self.numSamples:numSamples] = targets
+        self.numSamples = numSamples
+        return
+    
+    
+    def predict(self, features):
+        '''
+        predicted fitness values (tuples for multi-objective fitness) of rows of features
+        '''
+        if not self.numSamples:
+            raise ValueError("Surrogate model has not been trained on any evaluated individual")
+        trainFeatures, trainTargets = self.features[:self.numSamples], self.targets[:self.numSamples]
+        k = min(self.k, self.numSamples)
+        predictions = np.empty((len(features), trainTargets.shape[1]))
+        # squared distances as |a|^2 + |b|^2 - 2 a.b, in chunks of candidates bounding
+        # the chunk x samples distance matrix to 10^7 entries
+        trainNorms = (trainFeatures ** 2).sum(1)
+        chunkSize = max(1, 10**7 // max(1, self.numSamples))
+        for start in xrange(0, len(features), chunkSize):
+            chunk = features[start:start+chunkSize]
+            distances = (chunk ** 2).sum(1)[:, None] + trainNorms[None, :] - 2. * chunk.dot(trainFeatures.T)
+            np.maximum(distances, 0., distances)
+            nearest = np.argpartition(distances, k-1, axis=1)[:, :k] if k < self.numSamples else np.tile(np.arange(k), (len(chunk), 1))
+            weights = 1. / (np.sqrt(distances[np.arange(len(chunk))[:, None], nearest]) + 1e-12)
+            predictions[start:start+chunkSize] = (weights[:, :, None] * trainTargets[nearest]).sum(1) / weights.sum(1)[:, None]
+        if trainTargets.shape[1] == 1:
+            return predictions[:, 0].tolist()
+        return [tuple(row) for row in predictions.tolist()]
+    
+    
+    def getstate(self):
+        '''
+        snapshot of the training set, e.g. for checkpoints
+        '''
+        if self.features is None:
+            return None
+        return self.features[:self.numSamples].copy(), self.targets[:self.numSamples].copy()
+    
+    
+    def setstate(self, state):
+        self.features, self.targets, self.numSamples = None, None, 0
+        if state is not None:
+            self.features, self.targets = state[0].copy(), state[1].copy()
+            self.numSamples = len(self.features)
+        return
+    
+
+class GenomeArray():
+    '''
+    compact genome engine which stores a population as a numpy array, one row per
+    individual and one column per variable parameter, each entry being the decimal
+    value of the parameter's binary chromosome, or the value itself for continuous
+    parameters (in which case the array is of floats). Crossover and mutation never
+    produce a value beyond the possible values of a parameter, see
+    Simulator.crossover(...) and Simulator.mutation(...)
+    '''
+    def __init__(self, paramDict, sbxEta=15., mutSigma=0.1, rng=None):
+        '''
+        Args:
+            paramDict -- dict of variable parameters, each of which has 2 or more
+                possible values or is a ContinuousParam
+            sbxEta -- distribution index of simulated binary crossover of continuous parameters (default:15.)
+            mutSigma -- standard deviation of Gaussian mutation of continuous parameters,
+                relative to their range (default:0.1)
+            rng -- numpy.random.RandomState obj drawing random numbers (default:None, numpy.random)
+        '''
+        if not useNumpy:
+            raise ValueError("Fail to import 'numpy' module, which is required by the numpy genome engine")
+        self.pars = list(paramDict.keys())
+        self.values = [paramDict[par] for par in self.pars]
+        self.sbxEta = sbxEta
+        self.mutSigma = mutSigma
+        self.rng = rng if rng is not None else np.random
+        continuous = np.array([isinstance(values, ContinuousParam) for values in self.values], dtype=bool)
+        self.discrete = np.flatnonzero(~continuous)  # column indexes of discrete parameters
+        self.continuous = np.flatnonzero(continuous)  # column indexes of continuous parameters
+        self.lower = np.array([self.values[j].lower for j in self.continuous])
+        self.upper = np.array([self.values[j].upper for j in self.continuous])
+        self.dtype = np.float64 if len(self.continuous) else np.int64
+        # numbers of possible values and lengths of chr in binary form (0 for continuous pars)
+        self.numValues = np.array([0 if cont else len(values) for cont, values in zip(continuous, self.values)], dtype=np.int64)
+        self.lenChr = np.array([0 if cont else len(bin(len(values)-1).split('b')[-1]) for cont, values in zip(continuous, self.values)], dtype=np.int64)
+        self.formats = ['{:0%db}' % lenChr for lenChr in self.lenChr]
+        return
+    
+    
+    def fromPop(self, pop):
+        '''
+        convert a list of individuals (dicts of binary strings, or floats for continuous
+        parameters, as in Simulator.initPop(...)) to an array
+        '''
+        decode = [float if j in self.continuous else (lambda chr: int(chr, 2)) for j in xrange(len(self.pars))]
+        return np.array([[func(ind[par]) for func, par in zip(decode, self.pars)] for ind in pop], dtype=self.dtype).reshape(len(pop), len(self.pars))
+    
+    
+    def toPop(self, genes):
+        '''
+        convert an array to a list of individuals (dicts of binary strings, or floats for continuous parameters)
+        '''
+        cols = []
+        for j, fmt in enumerate(self.formats):
+            if j in self.continuous:
+                cols.append(genes[:, j].tolist())
+            else:
+                cols.append([fmt.format(int(i)) for i in genes[:, j].tolist()])
+        return [dict(zip(self.pars, row)) for row in zip(*cols)]
+    
+    
+    def random(self, popSize):
+        '''
+        generate 'popSize' individuals with random chromosomes
+        '''
+        u = self.rng.random_sample((popSize, len(self.pars)))
+        if not len(self.continuous):
+            return (u * self.numValues).astype(np.int64)
+        genes = np.floor(u * self.numValues)
+        genes[:, self.continuous] = self.lower + u[:, self.continuous] * (self.upper - self.lower)
+        return genes
+    
+    
+    def decode(self, genes):
+        '''
+        convert an array to a list of dicts of variable parameter values
+        '''
+        cols = []
+        for j, values in enumerate(self.values):
+            if j in self.continuous:
+                cols.append(genes[:, j].tolist())
+            else:
+                cols.append([values[int(i)] for i in genes[:, j].tolist()])
+        return [dict(zip(self.pars, row)) for row in zip(*cols)]
+    
+    
+    def features(self, genes):
+        '''
+        scale an array to [0, 1] per parameter: the index of the value of each discrete
+        parameter over the last index, or the position of each continuous parameter within its bounds
+        '''
+        lower = np.zeros(len(self.pars))
+        span = (self.numValues - 1).astype(float)
+        lower[self.continuous] = self.lower
+        span[self.continuous] = self.upper - self.lower
+        return (genes - lower) / span
+    
+    
+    def decodeColumns(self, genes):
+        '''
+        convert an array to a dict of numpy arrays of variable parameter values, one per parameter
+        '''
+        if not hasattr(self, 'valueArrays'):
+            self.valueArrays = [None if j in self.continuous else _valueArray(values) for j, values in enumerate(self.values)]
+        columns = {}
+        for j, (par, values) in enumerate(zip(self.pars, self.valueArrays)):
+            columns[par] = genes[:, j] if values is None else values[genes[:, j].astype(np.int64)]
+        return columns
+    
+    
+    def crossover(self, parents1, parents2, probCross):
+        '''
+        vectorized single-point crossover of each chromosome between parents1[i] and parents2[i]
+        with probability probCross, see Simulator.crossover(...), and simulated binary
+        crossover of each continuous parameter with probability probCross. Return two
+        arrays of offspring.
+        '''
+        if not len(self.continuous):
+            return self._crossoverChr(parents1, parents2, probCross, self.lenChr, self.numValues)
+        #
+        offspring1, offspring2 = parents1.copy(), parents2.copy()
+        if len(self.discrete):
+            offspring1[:, self.discrete], offspring2[:, self.discrete] = self._crossoverChr(parents1[:, self.discrete].astype(np.int64), parents2[:, self.discrete].astype(np.int64), probCross, self.lenChr[self.discrete], self.numValues[self.discrete])
+        x1, x2 = parents1[:, self.continuous], parents2[:, self.continuous]
+        cross = self.rng.random_sample(x1.shape) < probCross
+        beta = _sbxBeta(self.rng.random_sample(x1.shape), self.sbxEta)
+        offspring1[:, self.continuous] = np.where(cross, np.clip(0.5 * ((1 + beta) * x1 + (1 - beta) * x2), self.lower, self.upper), x1)
+        offspring2[:, self.continuous] = np.where(cross, np.clip(0.5 * ((1 - beta) * x1 + (1 + beta) * x2), self.lower, self.upper), x2)
+        return offspring1, offspring2
+    
+    
+    def _crossoverChr(self, parents1, parents2, probCross, lenChr, numValues):
+        '''
+        single-point crossover of binary chromosomes of lengths lenChr, stored as integer arrays
+        '''
+        shape = parents1.shape
+        cross = self.rng.random_sample(shape) < probCross
+        # crossover position counted from the leftmost bit, whole chr is swapped if its length is 1
+        position = (self.rng.random_sample(shape) * (lenChr - 1)).astype(np.int64) + 1
+        position = np.where(lenChr > 1, position, 0)
+        lowMask = np.where(cross, (1 << (lenChr - position)) - 1, 0)
+        offspring1 = (parents1 & ~lowMask) | (parents2 & lowMask)
+        offspring2 = (parents2 & ~lowMask) | (parents1 & lowMask)
+        # reject crossovers producing a value out of the range of a parameter
+        invalid = (offspring1 >= numValues) | (offspring2 >= numValues)
+        if invalid.any():
+            offspring1 = np.where(invalid, parents1, offspring1)
+            offspring2 = np.where(invalid, parents2, offspring2)
+        return offspring1, offspring2
+    
+    
+    def mutate(self, genes, probMut):
+        '''
+        flip each binary site of genes in place with probability probMut, rejecting
+        mutations of a chromosome which produce a value out of the range of its parameter,
+        and add Gaussian noise to each continuous parameter with probability probMut,
+        reflected back into its range
+        '''
+        lenChrs = self.lenChr[self.discrete]
+        flips = self.rng.random_sample((len(genes), int(lenChrs.sum()))) < probMut
+        start = 0
+        for j, lenChr, numValues in zip(self.discrete, lenChrs, self.numValues[self.discrete]):
+            bitValues = 1 << np.arange(lenChr-1, -1, -1, dtype=np.int64)
+            chrs = genes[:, j].astype(np.int64)
+            mutated = chrs ^ flips[:, start:start+lenChr].dot(bitValues)
+            genes[:, j] = np.where(mutated < numValues, mutated, chrs)
+            start += lenChr
+        #
+        if len(self.continuous):
+            x = genes[:, self.continuous]
+            mutate = self.rng.random_sample(x.shape) < probMut
+            noise = self.rng.normal(0., 1., x.shape) * self.mutSigma * (self.upper - self.lower)
+            genes[:, self.continuous] = np.where(mutate, _reflect(x + noise, self.lower, self.upper), x)
+        return
+    
+    
+    def neighbours(self, chromosomes):
+        '''
+        grid neighbours of a genotype (a row of genes): one row per parameter moved one
+        value up or down its list of values, or by mutSigma of its range for a continuous
+        parameter (clipped to its bounds), dropping moves out of range
+        '''
+        steps = np.ones(len(self.pars))
+        steps[self.continuous] = self.mutSigma * (self.upper - self.lower)
+        upper = (self.numValues - 1).astype(float)
+        upper[self.continuous] = self.upper
+        lower = np.zeros(len(self.pars))
+        lower[self.continuous] = self.lower
+        #
+        moves = np.concatenate([np.diag(steps), -np.diag(steps)])
+        rows = np.clip(chromosomes + moves, lower, upper).astype(self.dtype)
+        return rows[(rows != chromosomes).any(1)]
+    
+
+class PopFile():
+    '''
+    versioned binary population file, opened for reading through numpy.memmap so
+    that a subset of individuals can be sampled without loading the whole file.
+    Layout: magic 'GAPOP', uint8 format version, little-endian uint32 header length,
+    JSON header (parameter names, chromosome lengths, numbers of possible values,
+    bounds of continuous parameters, dtype, number of individuals, whether fitness
+    is saved and its number of objectives) padded to a multiple of 16 bytes, then the
+    genotype array (one row per individual, one column per parameter holding the
+    decimal value of its chromosome) in the smallest unsigned integer type that fits
+    the longest chromosome, or in float64 if there are continuous parameters,
+    optionally followed by the float64 fitness values, one per individual, or one row
+    of objectives per individual for multi-objective fitness. Version 1 files have no
+    number of objectives and a single fitness value per individual.
+    '''
+    magic = 'GAPOP'
+    version = 2
+    
+    def __init__(self, fileName):
+        if not useNumpy:
+            raise ValueError("Fail to import 'numpy' module, which is required to read binary population file %s" % fileName)
+        with open(fileName, 'rb') as fi:
+            if fi.read(len(self.magic)) != self.magic:
+                raise ValueError("%s is not a binary population file" % fileName)
+            version, headerLen = struct.unpack('<BI', fi.read(5))
+            if version > self.version:
+                raise ValueError("Binary population file %s has format version %d, which is newer than the supported version %d" % (fileName, version, self.version))
+            header = json.loads(fi.read(headerLen))
+        self.pars = [str(par) for par in header['pars']]
+        self.lenChr = header['lenChr']
+        self.numValues = header.get('numValues')
+        self.bounds = header.get('bounds')
+        self.numInd = header['numInd']
+        offset = len(self.magic) + 5 + headerLen
+        shape = (self.numInd, len(self.pars))
+        # numpy.memmap cannot map an empty region
+        if self.numInd and self.pars:
+            self.genes = np.memmap(fileName, dtype=header['dtype'], mode='r', offset=offset, shape=shape)
+        else:
+            self.genes = np.zeros(shape, dtype=header['dtype'])
+        offset += self.genes.nbytes
+        self.fitness = None
+        self.numObjectives = header.get('numObjectives', 1) if header['fitness'] else 0
+        if header['fitness'] and self.numInd:
+            shape = (self.numInd,) if self.numObjectives == 1 else (self.numInd, self.numObjectives)
+            self.fitness = np.memmap(fileName, dtype='<f8', mode='r', offset=offset, shape=shape)
+        return
+    
+    
+    @staticmethod
+    def isPopFile(fileName):
+        '''
+        return True if fileName is a binary population file, as opposed to a pickled one
+        '''
+        with open(fileName, 'rb') as fi:
+            return fi.read(len(PopFile.magic)) == PopFile.magic
+    
+    
+    @staticmethod
+    def genomeBounds(genome):
+        '''
+        list of [lower, upper] bounds of each parameter of GenomeArray genome, None for discrete parameters
+        '''
+        return [[values.lower, values.upper] if isinstance(values, ContinuousParam) else None for values in genome.values]
+    
+    
+    @staticmethod
+    def write(fi, genome, genes, fitness=None):
+        '''
+        write an array 'genes' of GenomeArray genome (and fitness values of its rows,
+        optional, a tuple of objectives per row for multi-objective fitness) to the file
+        object fi
+        '''
+        dtype = '<f8'
+        if not len(genome.continuous):
+            for nbytes in (1, 2, 4, 8):
+                dtype = '<u%d' % nbytes
+                if max(genome.lenChr.tolist() or [0]) <= 8 * nbytes:
+                    break
+        genes = np.asarray(genes).reshape(-1, len(genome.pars))
+        numObjectives = 0
+        if fitness is not None:
+            fitness = np.asarray(fitness, dtype='<f8')
+            numObjectives = fitness.shape[1] if fitness.ndim > 1 else 1
+        header = json.dumps({'pars': genome.pars, 'lenChr': genome.lenChr.tolist(), 'numValues': genome.numValues.tolist(), 'bounds': PopFile.genomeBounds(genome), 'dtype': dtype, 'numInd': len(genes), 'fitness': fitness is not None, 'numObjectives': numObjectives})
+        header += ' ' * (-(len(PopFile.magic) + 5 + len(header)) % 16)
+        fi.write(PopFile.magic + struct.pack('<BI', PopFile.version, len(header)) + header)
+        fi.write(np.ascontiguousarray(genes, dtype=dtype).tostring())
+        if fitness is not None:
+            fi.write(np.ascontiguousarray(fitness).tostring())
+        return
+    
+    
+    def sample(self, genome, popSize, rng=random):
+        '''
+        return an array of 'popSize' individuals, in the columns of GenomeArray genome,
+        sampled without replacement from the file by random.Random obj rng (with random
+        duplicates added if the file has fewer individuals), only reading the rows that
+        are sampled
+        '''
+        if sorted(self.pars) != sorted(genome.pars):
+            raise ValueError("Population file does not match variable parameters of the parameter space")
+        cols = [self.pars.index(par) for par in genome.pars]
+        if [self.lenChr[j] for j in cols] != genome.lenChr.tolist() or (self.numValues and [self.numValues[j] for j in cols] != genome.numValues.tolist()):
+            raise ValueError("Population file does not match the number of possible values of variable parameters")
+        if [(self.bounds or [None] * len(self.pars))[j] for j in cols] != PopFile.genomeBounds(genome):
+            raise ValueError("Population file does not match the bounds of continuous parameters")
+        if self.numInd == 0:
+            raise ValueError("Population file has no individuals")
+        #
+        if popSize > self.numInd:
+            N = popSize - self.numInd
+            if N <= self.numInd:
+                idxes = range(self.numInd) + rng.sample(xrange(self.numInd), N)
+            else:
+                idxes = range(self.numInd) + [rng.randint(0, self.numInd-1) for i in xrange(N)]
+        else:
+            idxes = sorted(rng.sample(xrange(self.numInd), popSize))
+        return np.asarray(self.genes[idxes], dtype=genome.dtype)[:, cols]
+    
+
 class Simulator():
-    def __init__(self, paramDict, numTopFitToSave=10, saveAt=1, initPopFile=None, outFile='result'):
+    def __init__(self, paramDict, numTopFitToSave=10, saveAt=1, initPopFile=None, outFile='result', workers=1, fitnessCache=None, engine='string', selection='roulette', tournamentSize=2, elite=0, replaceFrac=1.0, concurrency=1, batchFitness=False, resume=False, statsFile=None, onGeneration=None, stopCriteria=None, migration=None, arrayFitness=False, sbxEta=15., mutSigma=0.1, historyFile=None, seed=None, seedFitness=False, surrogate=None, localSearchEvery=0, localSearchSize=1, localSearchSteps=10, adaptiveRates=None, fidelities=None, halving=2.):
         '''
         Args: see self.evalFitness(...)
-            initPopFile -- file name of initial population. Load it as the
-                parameter setting of the ancestral gen if given (default:None)
+            initPopFile -- file name of initial population, either in binary
+                population format (see PopFile) or pickled by earlier versions.
+                Load it as the parameter setting of the ancestral gen if given (default:None)
+            workers -- number of worker processes evaluating fitness in parallel.
+                The fitness function must be defined at module level of a *.py
+                file, which is loaded once per worker (default:1, serial)
+            fitnessCache -- FitnessCache obj to look up fitness of parameter combinations
+                that have been evaluated before, not used by an array fitness function
+                (default:None, no caching)
+            engine -- genome engine, 'string' to store individuals as dicts of binary
+                strings or 'numpy' to store the population as a GenomeArray (default:'string')
+            selection -- strategy to choose mating individuals, 'roulette' (weights
+                proportional to reciprocal fitness), 'tournament', 'rank' (linear ranking),
+                'sus' (stochastic universal sampling with the weights of 'roulette', which
+                require positive fitness) or 'nsga2' for multi-objective fitness,
+                i.e. a fitness function returning a tuple of objective values (all minimized).
+                With 'nsga2', individuals are ranked by fast non-dominated sorting and crowding
+                distance, mates are chosen by crowded binary tournament, the next generation is
+                the best half of parents and offspring, and top fits hold the Pareto front
+                (see ParetoArchive), while elite and replaceFrac do not apply (default:'roulette')
+            tournamentSize -- number of individuals competing in each tournament (default:2)
+            elite -- number of fittest individuals copied to the next generation
+                along with their fitness values, without re-evaluation (default:0)
+            replaceFrac -- fraction of population replaced by offspring per generation,
+                set it < 1 for steady-state evolution in which the fittest of the
+                rest survive (default:1.0)
+            concurrency -- number of threads evaluating fitness concurrently, for fitness
+                functions that mostly wait on external processes or servers. A batch fitness
+                function is called concurrently on this many chunks of each batch (default:1)
+            batchFitness -- if True, the fitness function passed to self.evolve(...)
+                takes a list of parameter combinations and returns a list of their
+                fitness values, and is called once per generation (default:False)
+            resume -- if True, resume evolving from the checkpoint file outFile.ckpt,
+                which is saved along with the top fits and population (default:False)
+            statsFile -- file to stream per-generation statistics to, in CSV format if
+                its name ends with '.csv' or else in JSON lines (default:None)
+            onGeneration -- function called with the dict of statistics of each
+                generation, see self._genStats(...) (default:None)
+            stopCriteria -- function called with the dict of statistics of each generation,
+                which returns the reason to stop evolving before 'numGen' generations
+                (e.g. a StopCriteria obj), or None to go on (default:None)
+            migration -- Migration obj exchanging the fittest individuals with other
+                populations every 'migration.migrateEvery' generations, see IslandModel
+                (default:None)
+            arrayFitness -- if True, the fitness function passed to self.evolve(...) takes
+                a dict of numpy arrays of parameter values, one array per variable parameter
+                and fixed parameter values as they are, and returns a numpy array of fitness
+                values. It is called once per generation (default:False)
+            sbxEta -- distribution index of simulated binary crossover of continuous
+                parameters (ContinuousParam), larger values keep offspring closer to
+                their parents (default:15.)
+            mutSigma -- standard deviation of Gaussian mutation of continuous parameters,
+                relative to their range (default:0.1)
+            historyFile -- sqlite file to stream every evaluated individual to, along
+                with its generation and fitness, see HistoryDB (default:None)
+            seed -- seed of the random number generators of this simulator (self.rng and
+                self.npRng). The global random and numpy.random generators are used by the
+                simulator if not given (default:None)
+            seedFitness -- if True and seed is given, seed the global random and numpy.random
+                generators with an independent sub-stream of seed before each call of the
+                fitness function (in the main or a worker process), so that runs of a
+                stochastic fitness function are reproduced whatever the number of workers.
+                Batch and array fitness functions get one sub-stream per call, and threads
+                of 'concurrency' share the global generators, so that their results depend
+                on the chunking and on thread scheduling. Off by default as seeding costs
+                tens of microseconds per call (default:False)
+            surrogate -- KNNSurrogate obj pre-screening offspring, trained on every evaluated
+                individual: 'surrogate.oversample' times as many offspring as needed are bred
+                in each generation and only the ones of the best predicted fitness are
+                evaluated by the fitness function. Prediction error of the evaluated ones is
+                added to the statistics of each generation (default:None)
+            localSearchEvery -- run memetic local search every this many generations, in
+                which the 'localSearchSize' fittest individuals hill-climb over grid neighbours
+                (see GenomeArray.neighbours(...)) and improved ones replace them in the
+                population, 0 for no local search (default:0)
+            localSearchSize -- number of fittest individuals refined by local search (default:1)
+            localSearchSteps -- max number of hill-climbing steps of each local search (default:10)
+            adaptiveRates -- AdaptiveRates obj setting the probabilities of crossover and
+                mutation of each generation, which are added to its statistics (default:None,
+                the ones passed to self.evolve(...) throughout)
+            fidelities -- increasing fidelity levels of multi-fidelity evaluation, the last one
+                being full fidelity, e.g. [10, 30, 100] replicates of a stochastic simulation.
+                The fitness function then takes keyword argument 'fidelity', and the offspring of
+                each generation are evaluated by successive halving: all of them at the lowest
+                fidelity, then only the best-ranked 1/halving of them at each next fidelity.
+                Offspring eliminated at a lower fidelity keep their last score for selection,
+                and only full-fidelity scores enter top fits, fitness cache and history.
+                Offspring with a cached score skip the lower fidelities. Each evaluation at
+                a lower fidelity counts as fidelity/full fidelity of one in self.numEvals
+                (default:None, single fidelity)
+            halving -- reduction factor of the number of offspring re-evaluated at each next
+                fidelity (default:2.)
         '''
+        if engine not in ('string', 'numpy'):
+            raise ValueError("Unknown genome engine '%s'" % engine)
+        if selection not in ('roulette', 'tournament', 'rank', 'sus', 'nsga2'):
+            raise ValueError("Unknown selection strategy '%s'" % selection)
         self.paramDict = paramDict
         self.numTopFitToSave = numTopFitToSave
         self.saveAt = saveAt
         self.outFile = outFile
+        self.workers = workers
+        self.pool = None
+        self.concurrency = concurrency
+        self.threadPool = None
+        self.batchFitness = batchFitness
+        self.resume = resume
+        self.writer = None  # BackgroundWriter obj saving files during self.evolve(...)
+        self.statsFile = statsFile
+        self.onGeneration = onGeneration
+        self.stopCriteria = stopCriteria
+        self.migration = migration
+        self.arrayFitness = arrayFitness
+        self.sbxEta = sbxEta
+        self.mutSigma = mutSigma
+        self.historyFile = historyFile
+        self.seed = seed
+        self.seedFitness = seedFitness
+        self.rng, self.npRng = _makeRngs(seed)  # random.Random and numpy.random.RandomState objs
+        self._evalCount = (None, 0)  # generation and number of fitness evaluations in it so far
+        self.history = None  # HistoryDB obj during self.evolve(...)
+        self.gen = 0  # generation being evaluated
+        self.columnGenome = None  # GenomeArray obj decoding parameter values for the array fitness function
+        self.surrogate = surrogate
+        self.surrogateGenome = None  # GenomeArray obj converting individuals to features of the surrogate model
+        self.surrogateStats = {}  # prediction error of the surrogate model in the current generation
+        self._predicted = None  # predicted fitness values of the offspring being evaluated
+        self.localSearchEvery = localSearchEvery
+        self.localSearchSize = localSearchSize
+        self.localSearchSteps = localSearchSteps
+        self.localGenome = None  # GenomeArray obj generating grid neighbours of individuals
+        self.numImproved = 0  # number of individuals improved by local search in the current generation
+        self.adaptiveRates = adaptiveRates
+        self.genRates = collections.OrderedDict()  # probabilities of crossover and mutation in the current generation
+        self.mutFactors = None  # self-adaptive mutation factors of individuals of pop
+        self._childFactors = None  # self-adaptive mutation factors of offspring being bred
+        if fidelities is not None and (not fidelities or halving <= 1):
+            raise ValueError("Multi-fidelity evaluation requires at least one fidelity level and a halving factor > 1")
+        self.fidelities = fidelities
+        self.halving = halving
+        self.rungEvals = []  # numbers of individuals evaluated at each fidelity in the current generation
         
-        self.topFitness, self.topPars = [], [] # lists of top fitness values and their associated param combos
+        self.numEvals = 0  # number of calls to the fitness function, weighted by fidelity in multi-fidelity mode
+        self.startTime = time.time()  # time when self.evolve(...) started
+        self._lastCounts = (0, 0)  # numbers of evaluations and cache hits by the end of last generation
+        self.statsStream, self.statsWriter = None, None
+        self.phaseTimes = self._newPhaseTimes()  # seconds spent in each phase of the current generation
+        self.fitnessCache = fitnessCache
+        self.engine = engine
+        self.genome = None  # GenomeArray obj if engine is 'numpy'
+        self.selection = selection
+        self.tournamentSize = tournamentSize
+        self.elite = elite
+        self.replaceFrac = replaceFrac
+        
+        # top fitness values and their associated param combos
+        self.topFits = ParetoArchive(numTopFitToSave) if selection == 'nsga2' else TopFitArchive(numTopFitToSave)
         self.initPopFile = initPopFile
         
         return
@@ -46,24 +1495,28 @@ class Simulator():
     def initPop(self, paramDict, popSize):
         '''
         convert and translate the input parameter space to the initial population
-        Note: each value in paramDict must be a list that has 2^n elements, where n = 1,2,3,...
+        Note: each value in paramDict must be a list that has 2 or more elements, or a ContinuousParam
         '''
         # load an external file with a saved pop (optional)
-        if self.initPopFile:
+        if self.initPopFile and PopFile.isPopFile(self.initPopFile):
+            genome = GenomeArray(paramDict)
+            return genome.toPop(PopFile(self.initPopFile).sample(genome, popSize, self.rng))
+        
+        if self.initPopFile:  # pickled population saved by earlier versions
             with open(self.initPopFile, 'rb') as fi:
                 tmpPop = pickle.load(fi)
             
             if popSize > len(tmpPop): # add duplicates randomly to meet the popSize requirement
                 N = popSize - len(tmpPop)
                 if N <= len(tmpPop):
-                    addInds = random.sample(tmpPop, N)
+                    addInds = self.rng.sample(tmpPop, N)
                     tmpPop.extend(addInds)
                 else:
-                    idxes = [random.randint(0, len(tmpPop)-1) for i in range(N)]
+                    idxes = [self.rng.randint(0, len(tmpPop)-1) for i in range(N)]
                     [tmpPop.append(tmpPop[i]) for i in idxes]
             
             else:  # randomly remove inds from 'tmpPop' to meet the popSize requirement
-                random.shuffle(tmpPop)
+                self.rng.shuffle(tmpPop)
                 tmpPop = tmpPop[:popSize]
             
             return tmpPop
@@ -73,11 +1526,11 @@ class Simulator():
         pop = [{} for idx in range(popSize)]
         
         for par in pars:
-            # check if paramDict[par] has 2^n elements
-            n = math.log(len(paramDict[par]), 2)
-            
-            if math.ceil(n) != math.floor(n):
-                raise ValueError("parameter %s need to be specified 2^n possible values or set to be fixed" % par)
+            # assign a random value within range to continuous par
+            if isinstance(paramDict[par], ContinuousParam):
+                for idx in range(len(pop)):
+                    pop[idx][par] = self.rng.uniform(paramDict[par].lower, paramDict[par].upper)
+                continue
             
             # total number of possible values for par in decimal form
             maxDec = len(paramDict[par]) - 1
@@ -87,7 +1540,7 @@ class Simulator():
             
             # assign par/geno (binary) to each individual randomly 
             for idx in range(len(pop)):
-                rand = random.randint(0, maxDec)
+                rand = self.rng.randint(0, maxDec)
                 tmp = bin(rand).split('b')[-1]
                 pop[idx][par] = (lenChr - len(tmp)) * '0' + tmp
 
@@ -102,9 +1555,10 @@ class Simulator():
         parDict = {}
         
         for key, value in zip(individual.keys(), individual.values()):
-            binNum = '0b'+value
-            decNum = int(binNum, 2)
-            parDict[key] = self.paramDict[key][decNum]
+            if isinstance(value, float):  # continuous par
+                parDict[key] = value
+            else:
+                parDict[key] = self.paramDict[key][int(value, 2)]
         
         return parDict
              
@@ -113,37 +1567,275 @@ class Simulator():
         '''
         pass in a function to evaluate the fitness of the individual (represented by a parameter combination)
         '''
+        return self._evalParDict(self._makeParDict(individual, fixParamDict), fitnessFunc)
+    
+    
+    def _evalParDict(self, parDict, fitnessFunc):
+        '''
+        evaluate the fitness of a full parameter combination and update top fits
+        '''
+        fitness = None
+        if self.fitnessCache is not None:
+            fitness = self.fitnessCache.get(parDict)
+        
+        # calculate the fitness value (at full fidelity in multi-fidelity mode)
+        if fitness is None:
+            self.numEvals += 1
+            fidelity = self.fidelities[-1] if self.fidelities else None
+            evalSeed = self._evalSeeds(1)[0]
+            if self.batchFitness:
+                fitness = _callFitnessBatch(fitnessFunc, [parDict], fidelity, evalSeed)[0]
+            elif self.arrayFitness:
+                fitness = _fitnessList(_callFitnessArray(fitnessFunc, dict((par, _valueArray([value])) for par, value in parDict.items()), 1, fidelity, evalSeed))[0]
+            else:
+                fitness = _callFitness(fitnessFunc, parDict, fidelity, evalSeed)
+            if self.fitnessCache is not None:
+                self.fitnessCache.put(parDict, fitness)
+        
+        self._updateTopFits(parDict, fitness)
+        
+        return fitness
+    
+    
+    def _makeParDict(self, individual, fixParamDict):
+        '''
+        translate individual to the full parameter combination passed to the fitness function
+        '''
         # convert binary values to indexes for varied pars
         parDict = self._convertBinToPar(individual)
         
         # set fixed pars
         for par, value in zip(fixParamDict.keys(), fixParamDict.values()):
             parDict[par] = value
-            
-        # calculate the fitness value
-        try:
-            fitness = fitnessFunc(parDict)
-        except Exception, e:
-            print e
-            raise ValueError("Check Input! Fitness function fails to run on the following parameter combination!\n%s" % '\n'.join(["{} = {}".format(i,j) for i,j in zip(parDict.keys(), parDict.values())]))
         
-        # save top 'numTopFitToSave' fitness values and parCombos to self.topFitness and self.topPars
-        if len(self.topFitness) < self.numTopFitToSave and parDict not in self.topPars:
-            self.topFitness.append(fitness)
-            self.topPars.append(parDict)
+        return parDict
+    
+    
+    def _makeParDicts(self, pop, fixParamDict):
+        '''
+        translate all individuals of pop (a list of individuals or an array of
+        self.genome) to full parameter combinations
+        '''
+        if self.genome is None:
+            return [self._makeParDict(ind, fixParamDict) for ind in pop]
+        #
+        parDicts = self.genome.decode(pop)
+        for parDict in parDicts:
+            parDict.update(fixParamDict)
+        return parDicts
+    
+    
+    def _updateTopFits(self, parDict, fitness):
+        '''
+        save top 'numTopFitToSave' fitness values and parCombos to self.topFits
+        '''
+        self.topFits.add(parDict, fitness)
+        return
+    
+    
+    @property
+    def topFitness(self):
+        '''
+        list of top fitness values, fittest first
+        '''
+        return self.topFits.sorted()[0]
+    
+    
+    @property
+    def topPars(self):
+        '''
+        list of parameter combinations of top fits, fittest first
+        '''
+        return self.topFits.sorted()[1]
+    
+    
+    def evalPopFitness(self, pop, fixParamDict, fitnessFunc, pbar=None, fidelity=None):
+        '''
+        evaluate fitness of all individuals of pop as one batch, see self._evalParDicts(...).
+        Top fits are updated in the order of pop, so that results are identical
+        to evaluating the individuals one by one via self.evalFitness(...). In multi-fidelity
+        mode, evaluate at 'fidelity' (default to full fidelity); scores below full fidelity
+        bypass top fits, fitness cache and history.
+        '''
+        if self.fidelities and fidelity is None:
+            fidelity = self.fidelities[-1]
+        fullFidelity = not self.fidelities or fidelity == self.fidelities[-1]
+        
+        if self.arrayFitness:
+            return self._evalPopArray(pop, fixParamDict, fitnessFunc, pbar, fidelity, fullFidelity)
         
-        else:
-            maxFit = max(self.topFitness)
-            idxMaxFit = self.topFitness.index(maxFit)
-            if fitness < maxFit and parDict not in self.topPars:
-                del self.topFitness[idxMaxFit]
-                del self.topPars[idxMaxFit]
-                self.topFitness.append(fitness)
-                self.topPars.append(parDict)
+        parDicts = self._makeParDicts(pop, fixParamDict)
+        if not fullFidelity:
+            self.numEvals += len(parDicts) * self._evalCost(fidelity)
+            return list(self._evalParDicts(parDicts, fitnessFunc, fidelity))
+        
+        fitness = [None] * len(parDicts)
+        if self.fitnessCache is not None:
+            fitness = [self.fitnessCache.get(parDict) for parDict in parDicts]
+        
+        # with a cache, evaluate each parameter combination not evaluated before only once
+        toEval = collections.OrderedDict()
+        for idx, (parDict, fit) in enumerate(zip(parDicts, fitness)):
+            if fit is None:
+                toEval.setdefault(_parKey(parDict) if self.fitnessCache is not None else idx, []).append(idx)
+        evalDicts = [parDicts[idxes[0]] for idxes in toEval.values()]
+        self.numEvals += len(evalDicts)
+        
+        numDone = len(parDicts) - sum([len(idxes) for idxes in toEval.values()])
+        for idxes, fit in zip(toEval.values(), self._evalParDicts(evalDicts, fitnessFunc, fidelity)):
+            for idx in idxes:
+                fitness[idx] = fit
+            if self.fitnessCache is not None:
+                self.fitnessCache.put(parDicts[idxes[0]], fit)
+            numDone += len(idxes)
+            if pbar:
+                pbar.update(numDone)
+        if self.fitnessCache is not None:
+            self.fitnessCache.commit()
+        
+        for parDict, fit in zip(parDicts, fitness):
+            self._updateTopFits(parDict, fit)
+        if self.history is not None:
+            self.history.add(self.gen, parDicts, fitness)
         
         return fitness
     
     
+    def _evalPopArray(self, pop, fixParamDict, fitnessFunc, pbar=None, fidelity=None, fullFidelity=True):
+        '''
+        evaluate fitness of all individuals of pop in a single call of the array fitness
+        function, on a dict of numpy arrays of variable parameter values (one array per
+        parameter) and fixed parameter values (broadcast). Only individuals that may enter
+        top fits are translated to parameter combinations.
+        '''
+        genes = pop if self.genome is not None else self.columnGenome.fromPop(pop)
+        columns = self.columnGenome.decodeColumns(genes)
+        columns.update(fixParamDict)
+        fitness = _callFitnessArray(fitnessFunc, columns, len(genes), fidelity, self._evalSeeds(len(genes))[0])
+        self.numEvals += len(genes) * self._evalCost(fidelity)
+        if pbar:
+            pbar.update(len(genes))
+        if not fullFidelity:
+            return _fitnessList(fitness)
+        if self.history is not None:
+            self.history.addColumns(self.gen, columns, _fitnessList(fitness))
+        
+        # fitness values not smaller than the least fit of a full archive cannot enter it
+        fitnessList = _fitnessList(fitness)
+        if fitness.ndim == 1 and isinstance(self.topFits, TopFitArchive) and len(self.topFits) >= self.numTopFitToSave and len(self.topFits):
+            candidates = np.flatnonzero(fitness < self.topFits.worst())
+        else:
+            candidates = np.arange(len(genes))
+        parDicts = self.columnGenome.decode(genes[candidates])
+        for idx, parDict in zip(candidates.tolist(), parDicts):
+            parDict.update(fixParamDict)
+            self._updateTopFits(parDict, fitnessList[idx])
+        
+        return fitnessList
+    
+    
+    def _evalParDicts(self, parDicts, fitnessFunc, fidelity=None):
+        '''
+        generate fitness values of full parameter combinations in order: over worker
+        processes if self.pool is open, over threads if self.threadPool is open, in a
+        single call (or one call per worker or thread) if self.batchFitness, else one by
+        one. Each evaluation (or call of the batch fitness function) is seeded if
+        self.seedFitness, see self._evalSeeds(...)
+        '''
+        evalSeeds = self._evalSeeds(len(parDicts))
+        if self.batchFitness:
+            if self.pool is not None:
+                chunkSize = int(math.ceil(len(parDicts) / float(self.workers)))
+                chunks = [(parDicts[i:i+chunkSize], evalSeeds[i]) for i in xrange(0, len(parDicts), chunkSize)]
+                for fitness in self.pool.imap(functools.partial(_workerFitnessBatch, fidelity=fidelity), chunks):
+                    for fit in fitness:
+                        yield fit
+            elif self.threadPool is not None:
+                # threads share the global generators, which are left unseeded
+                chunkSize = int(math.ceil(len(parDicts) / float(self.concurrency)))
+                chunks = [parDicts[i:i+chunkSize] for i in xrange(0, len(parDicts), chunkSize)]
+                for fitness in self.threadPool.imap(lambda chunk: _callFitnessBatch(fitnessFunc, chunk, fidelity), chunks):
+                    for fit in fitness:
+                        yield fit
+            elif parDicts:
+                for fit in _callFitnessBatch(fitnessFunc, parDicts, fidelity, evalSeeds[0]):
+                    yield fit
+        #
+        elif self.pool is not None:
+            chunkSize = max(1, len(parDicts) // (self.workers * 4))
+            for fit in self.pool.imap(functools.partial(_workerFitness, fidelity=fidelity), zip(parDicts, evalSeeds), chunkSize):
+                yield fit
+        #
+        elif self.threadPool is not None:
+            # threads share the global generators, which are left unseeded
+            for fit in self.threadPool.imap(lambda parDict: _callFitness(fitnessFunc, parDict, fidelity), parDicts):
+                yield fit
+        #
+        else:
+            for parDict, evalSeed in zip(parDicts, evalSeeds):
+                yield _callFitness(fitnessFunc, parDict, fidelity, evalSeed)
+    
+    
+    def _evalCost(self, fidelity):
+        '''
+        number of full-fidelity evaluations an evaluation at 'fidelity' counts for
+        '''
+        if not self.fidelities or fidelity is None or fidelity == self.fidelities[-1]:
+            return 1
+        return float(fidelity) / self.fidelities[-1]
+    
+    
+    def _evalSeeds(self, numEvals):
+        '''
+        seeds of the global random number generators for the next 'numEvals' fitness
+        evaluations of generation self.gen, independent sub-streams of self.seed numbered
+        by the order of evaluations within the generation, or None unless self.seedFitness
+        '''
+        gen, start = self._evalCount
+        if gen != self.gen:
+            start = 0
+        self._evalCount = (self.gen, start + numEvals)
+        if self.seed is None or not self.seedFitness:
+            return [None] * numEvals
+        return [_deriveSeed(self.seed, 'eval', self.gen, idx) for idx in xrange(start, start + numEvals)]
+    
+    
+    def _openPool(self, fitnessFunc):
+        '''
+        start self.workers worker processes, each loading the module that defines fitnessFunc,
+        or self.concurrency threads to wait on I/O-bound fitness functions
+        '''
+        if self.arrayFitness:
+            if self.workers > 1 or self.concurrency > 1:
+                logging.warning("Array fitness function is evaluated in a single call per generation, ignore options of workers and concurrency")
+            return
+        if self.workers > 1 and self.concurrency > 1:
+            raise ValueError("Fitness can be evaluated by either multiple worker processes or multiple threads, not both")
+        #
+        if self.concurrency > 1:
+            self.threadPool = multiprocessing.pool.ThreadPool(self.concurrency)
+        #
+        if self.workers <= 1:
+            return
+        try:
+            fitnessFile = inspect.getsourcefile(fitnessFunc)
+        except TypeError:
+            fitnessFile = None
+        if not fitnessFile:
+            raise ValueError("Fitness function must be defined in a *.py file to be evaluated by multiple workers")
+        self.pool = multiprocessing.Pool(self.workers, _initWorker, (os.path.abspath(fitnessFile), fitnessFunc.__name__))
+        return
+    
+    
+    def _closePool(self):
+        for pool in (self.pool, self.threadPool):
+            if pool is not None:
+                pool.close()
+                pool.join()
+        self.pool, self.threadPool = None, None
+        return
+    
+    
     def diffParamType(self, paramSpaceDict):
         '''
         Differentiate two different types of parameters, variable ones and fixed ones.
@@ -154,14 +1846,14 @@ class Simulator():
         fixParamDict = {}
         
         for par, value in zip(paramSpaceDict.keys(), paramSpaceDict.values()):
+            if isinstance(value, ContinuousParam):
+                varParamDict[par] = value
+                continue
             try:
                 assert len(value) > 1
                 varParamDict[par] = value
             except:
                 fixParamDict[par] = value[0] if type(value) in (list, tuple) else value
-            #        
-            if varParamDict.has_key(par) and len(varParamDict[par]) % 2 != 0:
-                raise ValueError("Parameter %s specified in the parameter space need to be either a single element or a list of 2^n elements" % par)
         
         return varParamDict, fixParamDict
         
@@ -175,94 +1867,732 @@ class Simulator():
             probMut -- probability of point mutation occurring at each binary site
             fitnessFunc -- func obj to evaluate individual's fitness 
         '''
+        self.startTime = time.time()
+        
         # separate variable parameters from fixed parameters
         tmp = self.diffParamType(self.paramDict)
         varParamDict = tmp[0]
         fixParamDict = tmp[1]
         
+        if self.engine == 'numpy':
+            self.genome = GenomeArray(varParamDict, self.sbxEta, self.mutSigma, self.npRng)
+        if self.arrayFitness:
+            self.columnGenome = self.genome or GenomeArray(varParamDict)
+            if self.fitnessCache is not None:
+                logging.warning("Array fitness function is evaluated on the whole population in a single call per generation, ignore fitness cache")
+        if self.surrogate is not None:
+            self.surrogateGenome = self.genome or GenomeArray(varParamDict)
+        if self.localSearchEvery:
+            if not useNumpy:
+                raise ValueError("Fail to import 'numpy' module, which is required by local search")
+            self.localGenome = self.genome or GenomeArray(varParamDict, mutSigma=self.mutSigma)
+        
+        # resume from the last checkpoint (optional)
+        checkpoint = self._loadCheckpoint(varParamDict) if self.resume else None
+        if checkpoint:
+            pop, fitness, startGen = checkpoint['pop'], checkpoint['fitness'], checkpoint['gen'] + 1
+        
         # create initial population from 'varParamDict'
-        pop = self.initPop(varParamDict, popSize)
+        elif self.engine == 'numpy':
+            if self.initPopFile and PopFile.isPopFile(self.initPopFile):
+                pop = PopFile(self.initPopFile).sample(self.genome, popSize, self.rng)
+            elif self.initPopFile:
+                pop = self.genome.fromPop(self.initPop(varParamDict, popSize))
+            else:
+                pop = self.genome.random(popSize)
+            fitness, startGen = None, 1
+        else:
+            pop = self.initPop(varParamDict, popSize)
+            fitness, startGen = None, 1
+        
+        if self.adaptiveRates is not None and self.adaptiveRates.selfAdaptive:
+            self.mutFactors = (checkpoint or {}).get('mutFactors') or [1.] * len(pop)
+        
+        # start worker processes to evaluate fitness in parallel (optional)
+        self._openPool(fitnessFunc)
+        if self.fitnessCache is not None:
+            self.fitnessCache.bind(_fitnessFingerprint(fitnessFunc, self.fidelities[-1] if self.fidelities else None))
+        self.writer = BackgroundWriter()
+        self._openStats(append=bool(checkpoint))
+        if self.historyFile:
+            self.history = HistoryDB(self.historyFile, fromGen=startGen if checkpoint else 0)
+        try:
+            pop, fitness = self._evolvePop(pop, fitness, startGen, numGen, popSize, probCross, probMut, fixParamDict, fitnessFunc)
+        finally:
+            self._closePool()
+            self.writer.close()
+            self.writer = None
+            self._closeStats()
+            if self.history is not None:
+                self.history.close()
+                self.history = None
         
+        if self.genome is not None:
+            pop = self.genome.toPop(pop)
+        
+        if self.fitnessCache is not None and not self.arrayFitness:
+            logging.info("Fitness cache: %d hits, %d misses" % (self.fitnessCache.hits, self.fitnessCache.misses))
+        
+        return pop, fitness
+    
+    
+    def _evolvePop(self, pop, fitness, startGen, numGen, popSize, probCross, probMut, fixParamDict, fitnessFunc):
+        '''
+        evaluate the ancestral pop (unless its fitness is given) and evolve it from
+        generation 'startGen' to 'numGen', or until self.stopCriteria is met
+        '''
         # evaluate fitness for ancestral pop/initial pop
-        if useProgressBar:
-            progMes = "Evolving the ancestral population"
-            pbar = progressbar.ProgressBar(widgets=[progMes, ' ', progressbar.Percentage(), ' ', progressbar.Bar('.'), ' ', progressbar.ETA(), ' '], maxval=len(pop)).start()
+        if fitness is None:
+            pbar = None
+            if useProgressBar:
+                progMes = "Evolving the ancestral population"
+                pbar = progressbar.ProgressBar(widgets=[progMes, ' ', progressbar.Percentage(), ' ', progressbar.Bar('.'), ' ', progressbar.ETA(), ' '], maxval=len(pop)).start()
             
-        fitness = []
-        for idx, ind in enumerate(pop):
-            fitness.append(self.evalFitness(ind, fixParamDict=fixParamDict, fitnessFunc=fitnessFunc))
-            #
+            genStartTime = time.time()
+            self.phaseTimes = self._newPhaseTimes()
+            self.gen = 0
+            self.genRates = collections.OrderedDict([('probCross', None), ('probMut', None)])
+            if self.mutFactors is not None:
+                self.genRates['meanProbMut'] = None
+            if self.fidelities:
+                fitness, fullIdxes = self._successiveHalving(pop, fixParamDict, fitnessFunc)
+            else:
+                fitness = self.evalPopFitness(pop, fixParamDict=fixParamDict, fitnessFunc=fitnessFunc, pbar=pbar)
+            self.phaseTimes['evaluation'] += time.time() - genStartTime
+            if self.surrogate is not None:
+                self._trainSurrogate(*self._fullFidelity(pop, fitness, fullIdxes) if self.fidelities else (pop, fitness))
             if useProgressBar:
-                pbar.update(idx+1)
-        if useProgressBar:
-            pbar.finish()
+                pbar.finish()
+            if self._endGen(0, pop, fitness, genStartTime, save=False):
+                return pop, fitness
         
         # evolve 'numGen' generations
         if useProgressBar:
             progMesGen = "Evolving the population for %d generations" % numGen
             pbar = progressbar.ProgressBar(widgets=[progMesGen, ' ', progressbar.Percentage(), ' ', progressbar.Bar('.'), ' ', progressbar.ETA(), ' '], maxval=numGen).start()
         #
-        for idx, gen in enumerate(range(1, numGen+1)):
-            children = []
-            # fill up the offspring generation
-            while len(children) < popSize:
-                parents = self.chooseMatingInds(pop=pop, fitness=fitness, numInd=2)
-                offspring = self.crossover(parents, probCross)
-                self.mutation(offspring, probMut) # number of individuals-2
-                # add generated offspring to next gen
-                children.extend(offspring)
-            # {end while}
+        # number of fittest individuals carried over to the next generation without re-evaluation
+        numSurvivors = self._numSurvivors(popSize) if self.selection != 'nsga2' else 0
+        #
+        for gen in range(startGen, numGen+1):
+            genStartTime = time.time()
+            self.phaseTimes = self._newPhaseTimes()
+            self.gen = gen
+            self.surrogateStats = {}
+            genProbCross, genProbMut = probCross, probMut
+            if self.adaptiveRates is not None:
+                genProbCross, genProbMut = self.adaptiveRates(gen, numGen, probCross, probMut, self._diversity(pop))
+            self.genRates = collections.OrderedDict([('probCross', genProbCross), ('probMut', genProbMut)])
+            breed = self._screenOffspring if self.surrogate is not None and len(self.surrogate) else self._breed
+            if numSurvivors:
+                children = breed(pop, fitness, popSize - numSurvivors, genProbCross, genProbMut)[:popSize - numSurvivors]
+            else:
+                children = breed(pop, fitness, popSize, genProbCross, genProbMut)
+            if self.mutFactors is not None:
+                self._childFactors = self._childFactors[:len(children)]
+                self.genRates['meanProbMut'] = sum([min(1., factor * genProbMut) for factor in self._childFactors]) / len(self._childFactors)
             # evaluate fitness for generation 'gen'
-            fitness = []
-            for ind in children:
-                fitness.append(self.evalFitness(ind, fixParamDict=fixParamDict, fitnessFunc=fitnessFunc))
+            startTime = time.time()
+            if self.fidelities:
+                childFitness, fullIdxes = self._successiveHalving(children, fixParamDict, fitnessFunc)
+            else:
+                childFitness = self.evalPopFitness(children, fixParamDict=fixParamDict, fitnessFunc=fitnessFunc)
+            self.phaseTimes['evaluation'] += time.time() - startTime
+            if self.surrogate is not None:
+                self._trainSurrogate(*self._fullFidelity(children, childFitness, fullIdxes) if self.fidelities else (children, childFitness))
            
             # start the next generation
-            pop = children
+            if self.selection == 'nsga2':
+                pop, fitness = self._selectFronts(pop, fitness, children[:popSize], childFitness[:popSize], popSize)
+            elif numSurvivors:
+                pop, fitness = self._mergeSurvivors(pop, fitness, children, childFitness, numSurvivors)
+            else:
+                pop, fitness = children, childFitness
+                if self.mutFactors is not None:
+                    self.mutFactors = self._childFactors
+            
+            # exchange individuals with other islands (optional)
+            if self.migration is not None and gen % self.migration.migrateEvery == 0:
+                startTime = time.time()
+                pop, fitness = self._migrate(gen, pop, fitness)
+                self.phaseTimes['migration'] += time.time() - startTime
+            # refine the fittest individuals by hill-climbing (optional)
+            self.numImproved = 0
+            if self.localSearchEvery and gen % self.localSearchEvery == 0:
+                startTime = time.time()
+                pop, fitness = self._localSearch(pop, fitness, fixParamDict, fitnessFunc)
+                self.phaseTimes['localSearch'] += time.time() - startTime
             # update progress bar
             if useProgressBar:
-                pbar.update(idx+1)
+                pbar.update(gen)
             
-            # save topfit and current pop
-            if gen % self.saveAt == 0:
-                self._saveTopFits()
-                self._saveCurrPop(pop)
+            # save topfit, current pop and checkpoint every 'saveAt' generations and at the end
+            if self._endGen(gen, pop, fitness, genStartTime, save=gen % self.saveAt == 0 or gen == numGen):
+                break
             
         if useProgressBar:
             pbar.finish()
         return pop, fitness      
       
     
-    def _saveCurrPop(self, pop):
+    def _endGen(self, gen, pop, fitness, genStartTime, save):
+        '''
+        record statistics of generation 'gen' and check stopping criteria. Save top fits,
+        current pop and checkpoint if 'save' or if evolving stops. Return True to stop.
+        '''
+        stats = self._genStats(gen, pop, fitness)
+        stopReason = self.stopCriteria(stats) if self.stopCriteria is not None else None
+        #
+        if save or stopReason:
+            startTime = time.time()
+            self._save(gen, pop, fitness)
+            self.phaseTimes['saving'] += time.time() - startTime
+        #
+        self._recordGen(stats, time.time() - genStartTime)
+        if stopReason:
+            logging.info("Stop evolving at generation %d: %s" % (gen, stopReason))
+            return True
+        return False
+    
+    
+    def _newPhaseTimes(self):
+        return collections.OrderedDict((phase, 0.) for phase in ('selection', 'crossover', 'mutation', 'surrogate', 'evaluation', 'migration', 'localSearch', 'saving'))
+    
+    
+    def _diversity(self, pop):
+        '''
+        fraction of distinct genotypes in pop
+        '''
+        if not len(pop):
+            return 0.
+        if self.genome is not None:
+            return len(set(map(tuple, pop.tolist()))) / float(len(pop))
+        return len(set([tuple(sorted(ind.items())) for ind in pop])) / float(len(pop))
+    
+    
+    def _genStats(self, gen, pop, fitness):
+        '''
+        statistics of generation 'gen': fitness of its best and mean/median individuals,
+        the best fitness found so far, diversity (fraction of distinct genotypes), number
+        of fitness evaluations and cache hits in the generation and in total, probabilities
+        of crossover and mutation (and the mean self-adaptive one) in effect, accuracy of
+        self.surrogate, number of individuals improved by local search and numbers of
+        individuals evaluated at each fidelity (optional), and seconds elapsed since
+        self.evolve(...) started. Seconds spent in each phase are added by
+        self._recordGen(...)
+        '''
+        stats = collections.OrderedDict()
+        stats['gen'] = gen
+        if self.selection == 'nsga2':
+            # lists of statistics of each objective, and the size of the Pareto front found so far
+            summaries = [self._summary(values) for values in zip(*[_objectives(fit) for fit in fitness])]
+            stats['best'], stats['mean'], stats['median'] = [list(values) for values in zip(*summaries)]
+            stats['bestEver'] = [min(values) for values in zip(*[_objectives(fit) for fit in self.topFits.sorted()[0]])] or None
+            stats['paretoFront'] = len(self.topFits)
+        else:
+            stats['best'], stats['mean'], stats['median'] = self._summary(fitness)
+            stats['bestEver'] = self.topFits.sorted()[0][0] if len(self.topFits) else None
+        stats['diversity'] = self._diversity(pop)
+        stats.update(self.genRates)
+        if self.surrogate is not None:
+            # prediction error on the evaluated offspring and number of offspring discarded unevaluated
+            stats['surrogateError'] = self.surrogateStats.get('error')
+            stats['surrogateRankCorr'] = self.surrogateStats.get('rankCorr')
+            stats['screened'] = self.surrogateStats.get('screened', 0)
+        if self.localSearchEvery:
+            stats['localSearchImproved'] = self.numImproved
+        if self.fidelities:
+            # number of individuals evaluated at each fidelity
+            stats['rungEvaluations'] = self.rungEvals
+        # counts within this generation
+        cacheHits = self.fitnessCache.hits if self.fitnessCache is not None else 0
+        lastEvals, lastCacheHits = self._lastCounts
+        stats['evaluations'] = self.numEvals - lastEvals
+        stats['cacheHits'] = cacheHits - lastCacheHits
+        self._lastCounts = (self.numEvals, cacheHits)
+        stats['totalEvaluations'] = self.numEvals
+        stats['elapsed'] = time.time() - self.startTime
+        return stats
+    
+    
+    def _summary(self, values):
+        '''
+        minimum, mean and median of a list of values
+        '''
+        sortedValues = sorted(values)
+        mid = len(sortedValues) // 2
+        median = sortedValues[mid] if len(sortedValues) % 2 else (sortedValues[mid-1] + sortedValues[mid]) / 2.
+        return sortedValues[0], sum(sortedValues) / float(len(sortedValues)), median
+    
+    
+    def _openStats(self, append=False):
+        self.statsStream, self.statsWriter = None, None
+        if not self.statsFile:
+            return
+        self.statsStream = open(self.statsFile, 'a' if append else 'w')
+        return
+    
+    
+    def _recordGen(self, stats, genTime):
+        '''
+        add seconds spent in each phase of a generation to its statistics, stream them
+        to self.statsFile and pass them to self.onGeneration(...)
+        '''
+        for phase, seconds in self.phaseTimes.items():
+            stats['time_' + phase] = seconds
+        stats['time_total'] = genTime
+        #
+        if self.statsStream is not None:
+            if self.statsFile.endswith('.csv'):
+                if self.statsWriter is None:
+                    # columns are set by the first record, later records may lack or add some
+                    self.statsWriter = csv.DictWriter(self.statsStream, stats.keys(), restval='', extrasaction='ignore')
+                    if self.statsStream.tell() == 0:
+                        self.statsWriter.writeheader()
+                self.statsWriter.writerow(stats)
+            else:
+                self.statsStream.write(json.dumps(stats) + '\n')
+            self.statsStream.flush()
+        #
+        if self.onGeneration is not None:
+            self.onGeneration(stats)
+        return
+    
+    
+    def _closeStats(self):
+        if self.statsStream is not None:
+            self.statsStream.close()
+        self.statsStream, self.statsWriter = None, None
+        return
+    
+    
+    def _migrate(self, gen, pop, fitness):
+        '''
+        send copies of the 'self.migration.numMigrants' fittest individuals of pop to other
+        islands and replace the least fit individuals of pop by immigrants, which come
+        with their fitness values
+        '''
+        order = self._fitnessOrder(fitness)
+        emigrants = [pop[idx:idx+1] for idx in order[:self.migration.numMigrants]]
+        if self.genome is not None:
+            emigrants = [self.genome.toPop(ind)[0] for ind in emigrants]
+        else:
+            emigrants = [dict(ind[0]) for ind in emigrants]
+        emigrants = zip(emigrants, [fitness[idx] for idx in order[:self.migration.numMigrants]])
+        #
+        immigrants = self.migration.exchange(gen, emigrants)[:len(pop)]
+        fitness = list(fitness)
+        for idx, (ind, fit) in zip(reversed(order), immigrants):
+            pop[idx] = self.genome.fromPop([ind])[0] if self.genome is not None else ind
+            fitness[idx] = fit
+            if self.mutFactors is not None:
+                self.mutFactors[idx] = 1.
+        return pop, fitness
+    
+    
+    def _numSurvivors(self, popSize):
+        '''
+        number of individuals surviving to the next generation, the 'self.elite' fittest ones
+        or all but a fraction 'self.replaceFrac' of the population in steady-state mode
+        '''
+        if not 0 <= self.elite < popSize:
+            raise ValueError("Number of elite individuals need to be smaller than the population size")
+        if not 0 < self.replaceFrac <= 1:
+            raise ValueError("Fraction of population replaced per generation need to be within (0, 1]")
+        numReplace = max(1, int(round(self.replaceFrac * popSize)))
+        return max(self.elite, popSize - numReplace)
+    
+    
+    def _selectFronts(self, pop, fitness, children, childFitness, popSize):
+        '''
+        NSGA-II survival: form the next generation from the 'popSize' best individuals of
+        pop and the evaluated children, by non-domination rank and then crowding distance
+        '''
+        allFitness = list(fitness) + list(childFitness)
+        survivors = self._fitnessOrder(allFitness)[:popSize]
+        if self.mutFactors is not None:
+            allFactors = self.mutFactors + self._childFactors[:len(children)]
+            self.mutFactors = [allFactors[idx] for idx in survivors]
+        if self.genome is not None:
+            allPop = np.concatenate([pop, children])
+            return allPop[survivors], [allFitness[idx] for idx in survivors]
+        allPop = list(pop) + list(children)
+        return [allPop[idx] for idx in survivors], [allFitness[idx] for idx in survivors]
+    
+    
+    def _fitnessOrder(self, fitness):
+        '''
+        indexes of individuals sorted from the fittest one, by non-domination rank and
+        then decreasing crowding distance if self.selection is 'nsga2'
+        '''
+        if self.selection == 'nsga2':
+            objectives = [_objectives(fit) for fit in fitness]
+            ranks = _nonDominatedRanks(objectives)
+            distances = _crowdingDistances(objectives, ranks)
+            return sorted(xrange(len(fitness)), key=lambda idx: (ranks[idx], -distances[idx]))
+        return sorted(xrange(len(fitness)), key=lambda idx: fitness[idx])
+    
+    
+    def _mergeSurvivors(self, pop, fitness, children, childFitness, numSurvivors):
+        '''
+        form the next generation from the 'numSurvivors' fittest individuals of pop,
+        keeping their fitness values, and the evaluated children
+        '''
+        survivors = heapq.nsmallest(numSurvivors, xrange(len(fitness)), key=lambda idx: fitness[idx])
+        if self.mutFactors is not None:
+            self.mutFactors = [self.mutFactors[idx] for idx in survivors] + self._childFactors
+        if self.genome is not None:
+            nextPop = np.concatenate([pop[survivors], children])
+        else:
+            nextPop = [pop[idx] for idx in survivors] + children
+        return nextPop, [fitness[idx] for idx in survivors] + childFitness
+    
+    
+    def _breed(self, pop, fitness, numChildren, probCross, probMut):
+        '''
+        generate 'numChildren' (rounded up to even) offspring of pop via selection, crossover and mutation
+        '''
+        # draw all parent pairs of the offspring generation at once
+        startTime = time.time()
+        numPairs = (numChildren + 1) // 2
+        idxes = self._chooseMatingIdxes(fitness, 2 * numPairs)
+        self.phaseTimes['selection'] += time.time() - startTime
+        #
+        startTime = time.time()
+        if self.genome is not None:
+            offspring1, offspring2 = self.genome.crossover(pop[idxes[0::2]], pop[idxes[1::2]], probCross)
+            children = np.empty((2 * numPairs, pop.shape[1]), dtype=pop.dtype)
+            children[0::2] = offspring1
+            children[1::2] = offspring2
+        else:
+            children = []
+            # fill up the offspring generation
+            for idx in xrange(numPairs):
+                parents = [pop[idxes[2*idx]], pop[idxes[2*idx+1]]]
+                # add generated offspring to next gen
+                children.extend(self.crossover(parents, probCross))
+            # {end for}
+        self.phaseTimes['crossover'] += time.time() - startTime
+        #
+        startTime = time.time()
+        if self.mutFactors is not None:
+            # offspring of each pair inherit and perturb their parents' mutation factors
+            factors1 = [self.mutFactors[idx] for idx in idxes[0::2]]
+            factors2 = [self.mutFactors[idx] for idx in idxes[1::2]]
+            self._childFactors = [factor for pair in zip(self.adaptiveRates.childFactors(factors1, factors2, self.rng), self.adaptiveRates.childFactors(factors1, factors2, self.rng)) for factor in pair]
+            probMuts = [min(1., factor * probMut) for factor in self._childFactors]
+            if self.genome is not None:
+                self.genome.mutate(children, np.array(probMuts)[:, None])
+            else:
+                for child, childProbMut in zip(children, probMuts):
+                    self.mutation([child], childProbMut)
+        elif self.genome is not None:
+            self.genome.mutate(children, probMut)
+        else:
+            self.mutation(children, probMut)
+        self.phaseTimes['mutation'] += time.time() - startTime
+        return children
+    
+    
+    def _successiveHalving(self, pop, fixParamDict, fitnessFunc):
+        '''
+        multi-fidelity evaluation of pop: score all individuals at the lowest of
+        self.fidelities, then re-evaluate the best-ranked 1/self.halving of the ones
+        scored at each fidelity at the next one, up to full fidelity. Individuals whose
+        full-fidelity score is cached take it and are left out of the halving. Return the
+        last score of each individual and the indexes of the ones scored at full fidelity.
+        '''
+        fitness = [None] * len(pop)
+        idxes = range(len(pop))
+        cachedIdxes = []
+        if self.fitnessCache is not None:
+            cached = [parDict in self.fitnessCache for parDict in self._makeParDicts(pop, fixParamDict)]
+            cachedIdxes = [idx for idx in idxes if cached[idx]]
+            idxes = [idx for idx in idxes if not cached[idx]]
+        self.rungEvals = []
+        for rung, fidelity in enumerate(self.fidelities):
+            if rung and idxes:
+                numKeep = max(1, int(math.ceil(len(idxes) / float(self.halving))))
+                order = self._fitnessOrder([fitness[idx] for idx in idxes])
+                idxes = sorted([idxes[idx] for idx in order[:numKeep]])
+            if rung == len(self.fidelities) - 1:
+                idxes = sorted(cachedIdxes + idxes)
+            if idxes:
+                subPop = pop[idxes] if self.genome is not None else [pop[idx] for idx in idxes]
+                for idx, fit in zip(idxes, self.evalPopFitness(subPop, fixParamDict=fixParamDict, fitnessFunc=fitnessFunc, fidelity=fidelity)):
+                    fitness[idx] = fit
+            self.rungEvals.append(len(idxes) - (len(cachedIdxes) if rung == len(self.fidelities) - 1 else 0))
+        return fitness, idxes
+    
+    
+    def _fullFidelity(self, pop, fitness, fullIdxes):
+        '''
+        individuals of pop scored at full fidelity and their fitness values, to train
+        self.surrogate on, along with its predictions of them
+        '''
+        if self._predicted is not None:
+            self._predicted = [self._predicted[idx] for idx in fullIdxes]
+        subPop = pop[fullIdxes] if self.genome is not None else [pop[idx] for idx in fullIdxes]
+        return subPop, [fitness[idx] for idx in fullIdxes]
+    
+    
+    def _localSearch(self, pop, fitness, fixParamDict, fitnessFunc):
+        '''
+        steepest-descent hill-climbing of the 'self.localSearchSize' fittest distinct
+        genotypes of pop: in each step, the unvisited grid neighbours of all climbing
+        individuals are evaluated in one batch, and each one moves to its fittest neighbour
+        if it is fitter (dominates it, with 'nsga2'). Climbing stops after
+        'self.localSearchSteps' steps or when none improves. Return pop and fitness with
+        the improved individuals in place of the original ones.
+        '''
+        genome = self.localGenome
+        genes = pop if self.genome is not None else genome.fromPop(pop)
+        if self.selection == 'nsga2':
+            better = lambda fit1, fit2: _dominates(_objectives(fit1), _objectives(fit2))
+        else:
+            better = lambda fit1, fit2: fit1 < fit2
+        #
+        idxes, visited = [], set()
+        for idx in self._fitnessOrder(fitness):
+            if len(idxes) == self.localSearchSize:
+                break
+            key = tuple(genes[idx].tolist())
+            if key not in visited:
+                visited.add(key)
+                idxes.append(idx)
+        current = genes[idxes].copy()
+        currentFitness = [fitness[idx] for idx in idxes]
+        #
+        climbing, moved = range(len(idxes)), set()
+        for step in xrange(self.localSearchSteps):
+            # unvisited neighbours of climbing individuals, deduplicated
+            neighbours, owners = [], []
+            for slot in climbing:
+                for row in genome.neighbours(current[slot]):
+                    key = tuple(row.tolist())
+                    if key not in visited:
+                        visited.add(key)
+                        neighbours.append(row)
+                        owners.append(slot)
+            if not neighbours:
+                break
+            neighbours = np.array(neighbours, dtype=genome.dtype)
+            neighbourPop = neighbours if self.genome is not None else genome.toPop(neighbours)
+            neighbourFitness = self.evalPopFitness(neighbourPop, fixParamDict=fixParamDict, fitnessFunc=fitnessFunc)
+            if self.surrogate is not None:
+                self._trainSurrogate(neighbourPop, neighbourFitness)
+            #
+            improved = set()
+            for row, slot, fit in zip(neighbours, owners, neighbourFitness):
+                if better(fit, currentFitness[slot]):
+                    current[slot], currentFitness[slot] = row, fit
+                    improved.add(slot)
+            climbing = sorted(improved)
+            moved.update(improved)
+            if not climbing:
+                break
+        #
+        fitness = list(fitness)
+        if self.genome is not None:
+            pop = pop.copy()
+        else:
+            pop = list(pop)
+        for slot in moved:
+            idx = idxes[slot]
+            pop[idx] = current[slot] if self.genome is not None else genome.toPop(current[slot:slot+1])[0]
+            fitness[idx] = currentFitness[slot]
+        self.numImproved = len(moved)
+        return pop, fitness
+    
+    
+    def _screenOffspring(self, pop, fitness, numChildren, probCross, probMut):
+        '''
+        breed 'self.surrogate.oversample' times as many candidate offspring as 'numChildren'
+        (rounded up to even) and keep the ones of the best fitness predicted by self.surrogate
+        '''
+        candidates = self._breed(pop, fitness, int(math.ceil(numChildren * self.surrogate.oversample)), probCross, probMut)
+        startTime = time.time()
+        predicted = self.surrogate.predict(self._surrogateFeatures(candidates))
+        keep = sorted(self._fitnessOrder(predicted)[:numChildren + numChildren % 2])
+        self._predicted = [predicted[idx] for idx in keep]
+        if self.mutFactors is not None:
+            self._childFactors = [self._childFactors[idx] for idx in keep]
+        self.surrogateStats['screened'] = len(candidates) - len(keep)
+        self.phaseTimes['surrogate'] += time.time() - startTime
+        if self.genome is not None:
+            return candidates[keep]
+        return [candidates[idx] for idx in keep]
+    
+    
+    def _trainSurrogate(self, pop, fitness):
+        '''
+        measure prediction error of self.surrogate on the evaluated pop (if it was screened)
+        and add pop and its fitness values to the training set
+        '''
+        startTime = time.time()
+        if self._predicted is not None:
+            predicted = np.array([_objectives(fit) for fit in self._predicted[:len(fitness)]], dtype=float)
+            actual = np.array([_objectives(fit) for fit in fitness], dtype=float)
+            finite = np.isfinite(actual).all(1)
+            predicted, actual = predicted[finite], actual[finite]
+            if len(actual):
+                errors = np.abs(predicted - actual).mean(0).tolist()
+                rankCorrs = [_rankCorrelation(predicted[:, j], actual[:, j]) for j in xrange(actual.shape[1])]
+                self.surrogateStats['error'] = errors[0] if len(errors) == 1 else errors
+                self.surrogateStats['rankCorr'] = rankCorrs[0] if len(rankCorrs) == 1 else rankCorrs
+            self._predicted = None
+        self.surrogate.add(self._surrogateFeatures(pop), fitness)
+        self.phaseTimes['surrogate'] += time.time() - startTime
+        return
+    
+    
+    def _surrogateFeatures(self, pop):
+        genes = pop if self.genome is not None else self.surrogateGenome.fromPop(pop)
+        return self.surrogateGenome.features(genes)
+    
+    
+    def _save(self, gen, pop, fitness):
+        '''
+        take a snapshot of top fits, current population and the state needed to resume
+        evolving after generation 'gen', and save them in the background
+        '''
+        topFitness, topPars = self.topFits.sorted()
+        pop = np.array(pop) if self.genome is not None else list(pop)
+        # plain data only, so that checkpoints do not depend on the module classes were pickled from
+        checkpoint = {
+            'gen': gen,
+            'fitness': list(fitness),
+            'topFits': self.topFits.items(),
+            'randomState': self.rng.getstate(),
+            'numpyState': self.npRng.get_state() if useNumpy else None,
+            'surrogate': self.surrogate.getstate() if self.surrogate is not None else None,
+            'mutFactors': list(self.mutFactors) if self.mutFactors is not None else None,
+            # state of stopping criteria: evaluation budget, time elapsed and stagnation
+            'numEvals': self.numEvals,
+            'elapsed': time.time() - self.startTime,
+            'stopState': self.stopCriteria.getstate() if isinstance(self.stopCriteria, StopCriteria) else None,
+        }
+        self.writer.submit(self._saveFiles, topFitness, topPars, pop, checkpoint)
+        return
+    
+    
+    def _saveFiles(self, topFitness, topPars, pop, checkpoint):
         '''
-        save current population via pickle
+        write top fits, pop and checkpoint, which holds pop as a genotype array (with the
+        names of its parameter columns), or as a list of dicts if numpy is unavailable
         '''
-        with open(self.outFile+'.pop', 'wb') as fi:
-            pickle.dump(pop, fi)
+        _atomicWrite(self.outFile+'.fit', lambda fi: self._writeTopFits(fi, topFitness, topPars), mode='w')
+        genome, genes = self._popArray(pop)
+        _atomicWrite(self.outFile+'.pop', lambda fi: self._writePop(fi, genes, checkpoint['fitness'], genome))
+        checkpoint = dict(checkpoint, pop=genes, pars=genome.pars if genome is not None else None)
+        _atomicWrite(self.outFile+'.ckpt', lambda fi: pickle.dump(checkpoint, fi, pickle.HIGHEST_PROTOCOL))
         return
     
     
+    def _loadCheckpoint(self, varParamDict):
+        '''
+        load checkpoint outFile.ckpt and restore top fits, random number generator states,
+        and the numbers of evaluations, time elapsed and state of self.stopCriteria. Return
+        the checkpoint, with its pop in the representation of the genome engine, or None
+        if there is no checkpoint file.
+        '''
+        ckptFile = self.outFile+'.ckpt'
+        if not os.path.exists(ckptFile):
+            logging.warning("Checkpoint file %s does not exist, evolve from the ancestral population" % ckptFile)
+            return None
+        with open(ckptFile, 'rb') as fi:
+            checkpoint = pickle.load(fi)
+        pop, pars = checkpoint['pop'], checkpoint.get('pars')
+        if pars is not None:
+            # genotype array, with columns reordered to the genome of the parameter space
+            genome = self.genome or GenomeArray(varParamDict)
+            if sorted(pars) != sorted(genome.pars):
+                raise ValueError("Checkpoint file %s does not match variable parameters of the parameter space" % ckptFile)
+            genes = pop[:, [pars.index(par) for par in genome.pars]].astype(genome.dtype)
+            checkpoint['pop'] = genes if self.genome is not None else genome.toPop(genes)
+        else:
+            if pop and sorted(pop[0].keys()) != sorted(varParamDict.keys()):
+                raise ValueError("Checkpoint file %s does not match variable parameters of the parameter space" % ckptFile)
+            if self.genome is not None:
+                checkpoint['pop'] = self.genome.fromPop(pop)
+        #
+        topFits = checkpoint['topFits']
+        if isinstance(topFits, list):
+            self.topFits = ParetoArchive(self.numTopFitToSave) if self.selection == 'nsga2' else TopFitArchive(self.numTopFitToSave)
+            for fit, parDict in topFits:
+                self.topFits.add(parDict, fit)
+        else:
+            # archive obj pickled by earlier versions
+            self.topFits = topFits
+        self.rng.setstate(checkpoint['randomState'])
+        if useNumpy and checkpoint['numpyState'] is not None:
+            self.npRng.set_state(checkpoint['numpyState'])
+        if self.surrogate is not None:
+            self.surrogate.setstate(checkpoint.get('surrogate'))
+        # go on counting evaluations and time of the interrupted run
+        self.numEvals = checkpoint.get('numEvals', 0)
+        self.startTime = time.time() - checkpoint.get('elapsed', 0.)
+        self._lastCounts = (self.numEvals, self.fitnessCache.hits if self.fitnessCache is not None else 0)
+        if isinstance(self.stopCriteria, StopCriteria) and checkpoint.get('stopState') is not None:
+            self.stopCriteria.setstate(checkpoint['stopState'])
+        logging.info("Resume evolving from generation %d of checkpoint file %s" % (checkpoint['gen'], ckptFile))
+        return checkpoint
+    
+    
+    def _saveCurrPop(self, pop, fitness=None):
+        '''
+        save current population (and its fitness values, optional) in binary population format
+        '''
+        _atomicWrite(self.outFile+'.pop', lambda fi: self._writePop(fi, pop, fitness))
+        return
+    
+    
+    def _writePop(self, popFile, pop, fitness, genome=None):
+        '''
+        write pop to popFile in binary population format (see PopFile), or via pickle
+        as a list of dicts of binary strings if numpy is unavailable. pop is an array
+        of genome if given, see self._popArray(...)
+        '''
+        if genome is None:
+            genome, pop = self._popArray(pop)
+        if genome is None:
+            pickle.dump(pop, popFile)
+        else:
+            PopFile.write(popFile, genome, pop, fitness)
+        return
+    
+    
+    def _popArray(self, pop):
+        '''
+        return a GenomeArray obj and pop as its array, or None and pop as it is if numpy is unavailable
+        '''
+        if not useNumpy:
+            return None, pop
+        if self.genome is not None and not isinstance(pop, list):
+            return self.genome, pop
+        genome = GenomeArray(dict((par, self.paramDict[par]) for par in (pop[0] if pop else [])))
+        return genome, genome.fromPop(pop)
+    
+    
     def _saveTopFits(self):
         '''
         save parameter combinations of top fits
         '''
-        topFitness, topPars = copy.deepcopy(self.topFitness), copy.deepcopy(self.topPars)
-        
-        flag = len(topFitness)
-        parFile = open(self.outFile+'.fit', 'w')
-        pars = self.topPars[0].keys()
-        parFile.write('\t'.join(['fitness'] + pars) + '\n')
+        topFitness, topPars = self.topFits.sorted()
+        _atomicWrite(self.outFile+'.fit', lambda fi: self._writeTopFits(fi, topFitness, topPars), mode='w')
+        return
+    
+    
+    def _writeTopFits(self, parFile, topFitness, topPars):
+        pars = topPars[0].keys()
+        # one column per objective of multi-objective fitness
+        numObjectives = len(topFitness[0]) if isinstance(topFitness[0], (tuple, list)) else 0
+        fitnessCols = ['fitness_%d' % (obj+1) for obj in xrange(numObjectives)] if numObjectives else ['fitness']
+        parFile.write('\t'.join(fitnessCols + pars) + '\n')
         
-        while flag > 0:
-            idx = topFitness.index(min(topFitness))
-            parFile.write("%.6f\t" % topFitness[idx])
-            parFile.write('\t'.join([str(topPars[idx][p]) for p in pars]) + '\n')
-            del topFitness[idx]
-            del topPars[idx]
-            
-            flag -= 1
-            
-        parFile.close()
+        for fitness, parDict in zip(topFitness, topPars):
+            parFile.write(''.join(["%.6f\t" % fit for fit in _objectives(fitness)]))
+            parFile.write('\t'.join([str(parDict[p]) for p in pars]) + '\n')
         
         return    
     
@@ -281,18 +2611,31 @@ class Simulator():
         for par in pars:
             chr1 = parent1[par]
             chr2 = parent2[par]
+            # simulated binary crossover of continuous par
+            if isinstance(chr1, float):
+                offChr1, offChr2 = chr1, chr2
+                if self.rng.random() < probCross:
+                    beta = _sbxBeta(self.rng.random(), self.sbxEta)
+                    lower, upper = self.paramDict[par].lower, self.paramDict[par].upper
+                    offChr1 = min(max(0.5 * ((1 + beta) * chr1 + (1 - beta) * chr2), lower), upper)
+                    offChr2 = min(max(0.5 * ((1 - beta) * chr1 + (1 + beta) * chr2), lower), upper)
             # if the length of binary seq == 1 (two values specified for par), parent1 passes par to offspring 2 and parent2 to offspring 1 if random() < probCross
-            if len(chr1) == 1:
-                if random.random() < probCross:    
+            elif len(chr1) == 1:
+                if self.rng.random() < probCross:    
                     offChr1 = chr2
                     offChr2 = chr1
                 else:
                     offChr1 = chr1
                     offChr2 = chr2
-            elif random.random() < probCross:
-                position = random.randint(1, len(chr1)-1)
+            elif self.rng.random() < probCross:
+                position = self.rng.randint(1, len(chr1)-1)
                 offChr1 = chr1[:position] + chr2[position:]
                 offChr2 = chr2[:position] + chr1[position:]
+                # reject the crossover if it produces a value out of the range of par
+                numValues = len(self.paramDict[par])
+                if numValues & (numValues-1) and max(int(offChr1, 2), int(offChr2, 2)) >= numValues:
+                    offChr1 = chr1
+                    offChr2 = chr2
             else:
                 offChr1 = chr1
                 offChr2 = chr2
@@ -305,19 +2648,31 @@ class Simulator():
     
     def mutation(self, individuals, probMut):
         '''
-        perform point mutations among individuals 
+        perform point mutations among individuals, rejecting mutations of a chromosome
+        which produce a value out of the range of its parameter. Continuous parameters
+        are mutated with probability probMut by adding Gaussian noise, reflected back
+        into their range
         '''
         pars = individuals[0].keys()
+        continuous = [par for par in pars if isinstance(self.paramDict[par], ContinuousParam)]
+        pars = [par for par in pars if par not in continuous]
+        numValues = dict((par, len(self.paramDict[par])) for par in pars)
         for ind in individuals:
+            for par in continuous:
+                if self.rng.random() < probMut:
+                    lower, upper = self.paramDict[par].lower, self.paramDict[par].upper
+                    ind[par] = _reflect(ind[par] + self.rng.gauss(0., self.mutSigma * (upper - lower)), lower, upper)
             for par in pars:
                 chr = ind[par]
                 for idx in xrange(len(chr)):
-                    if random.random() < probMut:
+                    if self.rng.random() < probMut:
                         if chr[idx] == '0':
                             chr = chr[:idx] + '1' + chr[idx+1:]
                         else:
                             chr = chr[:idx] + '0' + chr[idx+1:]
                     #
+                if chr != ind[par] and int(chr, 2) >= numValues[par]:
+                    continue
                 ind[par] = chr
             # {end For: par}
         # {end For: ind}
@@ -326,24 +2681,356 @@ class Simulator():
         
     def chooseMatingInds(self, pop, fitness, numInd):
         '''
-        stochastic sampling for 'numInd' individuals according to fitness values with replacement (roulette wheel selection)
+        stochastic sampling for 'numInd' individuals according to fitness values with replacement,
+        using the selection strategy self.selection
         '''
-        recipFitness = [1./fit for fit in fitness]
-        sumRecFit = sum(recipFitness)
-        weight = [i/sumRecFit for i in recipFitness]
-        roulette = [sum(weight[:i]) for i in xrange(1, len(weight)+1)]
-        #
-        matingInds = []
+        return [pop[idx] for idx in self._chooseMatingIdxes(fitness, numInd)]
+    
+    
+    def _chooseMatingIdxes(self, fitness, numInd):
+        '''
+        select 'numInd' indexes of individuals, see self.chooseMatingInds(...)
+        '''
+        if self.selection == 'nsga2':
+            return self._crowdedTournamentIdxes(fitness, numInd)
+        elif self.selection == 'tournament':
+            return self._tournamentIdxes(fitness, numInd)
+        elif self.selection == 'rank':
+            return self._rankIdxes(fitness, numInd)
+        elif self.selection == 'sus':
+            return self._susIdxes(fitness, numInd)
+        else:
+            return self._rouletteIdxes(fitness, numInd)
+    
+    
+    def _cumulativeWeights(self, weights):
+        '''
+        normalized cumulative weights, i.e. the slots of a roulette wheel
+        '''
+        sumWeight = float(sum(weights))
+        roulette = []
+        cumWeight = 0.
+        for i in weights:
+            cumWeight += i/sumWeight
+            roulette.append(cumWeight)
+        return roulette
+    
+    
+    def _spinWheel(self, roulette, numInd):
+        '''
+        draw 'numInd' slots of the roulette wheel by bisection
+        '''
+        lastIdx = len(roulette) - 1
+        # index of the first slot of the wheel exceeding rand, the last one if rounding leaves none
+        return [min(bisect.bisect_right(roulette, self.rng.random()), lastIdx) for num in xrange(numInd)]
+    
+    
+    def _rouletteIdxes(self, fitness, numInd):
+        '''
+        roulette wheel selection with weights proportional to reciprocal fitness values.
+        The cumulative weights are computed once and each individual is drawn by bisection.
+        '''
+        return self._spinWheel(self._cumulativeWeights([1./fit for fit in fitness]), numInd)
+    
+    
+    def _tournamentIdxes(self, fitness, numInd):
+        '''
+        tournament selection, each time choosing the fittest of 'self.tournamentSize' individuals drawn at random
+        '''
+        lastIdx = len(fitness) - 1
+        matingIdxes = []
         for num in xrange(numInd):
-            rand = random.random()
-            try:
-                idx = [rand < i for i in roulette].index(True)
-                matingInds.append(pop[idx])
-            except:
-                matingInds.append(pop[-1])
+            contestants = [self.rng.randint(0, lastIdx) for i in xrange(self.tournamentSize)]
+            matingIdxes.append(min(contestants, key=lambda idx: fitness[idx]))
+        return matingIdxes
+    
+    
+    def _crowdedTournamentIdxes(self, fitness, numInd):
+        '''
+        NSGA-II crowded binary tournament selection, each time choosing the one of two
+        individuals drawn at random with the lower non-domination rank, or the larger
+        crowding distance if they are of the same rank
+        '''
+        objectives = [_objectives(fit) for fit in fitness]
+        ranks = _nonDominatedRanks(objectives)
+        distances = _crowdingDistances(objectives, ranks)
+        lastIdx = len(fitness) - 1
+        matingIdxes = []
+        for num in xrange(numInd):
+            contestants = [self.rng.randint(0, lastIdx) for i in xrange(2)]
+            matingIdxes.append(min(contestants, key=lambda idx: (ranks[idx], -distances[idx])))
+        return matingIdxes
+    
+    
+    def _rankIdxes(self, fitness, numInd):
+        '''
+        linear rank selection, with weights 1 for the least fit individual up to n for the fittest one
+        '''
+        order = sorted(xrange(len(fitness)), key=lambda idx: fitness[idx], reverse=True)
+        ranks = [0] * len(fitness)
+        for rank, idx in enumerate(order):
+            ranks[idx] = rank + 1
+        return self._spinWheel(self._cumulativeWeights(ranks), numInd)
+    
+    
+    def _susIdxes(self, fitness, numInd):
+        '''
+        stochastic universal sampling with weights proportional to reciprocal fitness values:
+        'numInd' evenly spaced pointers from a single random start sweep the roulette wheel once.
+        Selected individuals are shuffled so that mates are paired at random. Fitness values
+        must be positive.
+        '''
+        if min(fitness) <= 0:
+            raise ValueError("Selection strategy 'sus' requires positive fitness values, got %s. Use selection strategy 'rank' or 'tournament' instead" % min(fitness))
+        roulette = self._cumulativeWeights([1./fit for fit in fitness])
+        lastIdx = len(roulette) - 1
+        step = 1. / numInd
+        pointer = self.rng.random() * step
+        matingIdxes = []
+        idx = 0
+        for num in xrange(numInd):
+            while idx < lastIdx and roulette[idx] <= pointer:
+                idx += 1
+            matingIdxes.append(idx)
+            pointer += step
+        self.rng.shuffle(matingIdxes)
+        return matingIdxes
+        
+
+# queues of the island model, served by IslandModel's manager process
+_islandQueues = collections.defaultdict(Queue.Queue)
+
+
+def _getIslandQueue(name):
+    return _islandQueues[name]
+
+
+class IslandManager(multiprocessing.managers.BaseManager):
+    '''
+    serve queues to islands running in local processes or on other hosts, over a socket
+    '''
+    pass
+
+IslandManager.register('getQueue', callable=_getIslandQueue)
+
+
+def _islandTargets(islandIdx, numIslands, topology):
+    '''
+    islands that island 'islandIdx' sends its emigrants to
+    '''
+    if topology == 'ring':
+        return [(islandIdx + 1) % numIslands] if numIslands > 1 else []
+    else:  # fully connected
+        return [idx for idx in xrange(numIslands) if idx != islandIdx]
+
+
+class Migration():
+    '''
+    synchronous exchange of individuals between island 'islandIdx' and its neighbours
+    on the topology, through the queues of an IslandManager
+    '''
+    def __init__(self, islandIdx, numIslands, migrateEvery, numMigrants, topology, manager):
+        self.islandIdx = islandIdx
+        self.migrateEvery = migrateEvery
+        self.numMigrants = numMigrants
+        self.targets = _islandTargets(islandIdx, numIslands, topology)
+        self.sources = [idx for idx in xrange(numIslands) if islandIdx in _islandTargets(idx, numIslands, topology)]
+        self.inbox = manager.getQueue(('inbox', islandIdx))
+        self.outboxes = [manager.getQueue(('inbox', idx)) for idx in self.targets]
+        
+        self.pending = collections.defaultdict(dict)  # emigrants received ahead of time, by generation and source
+        self.finishedSources = set()
+        return
+    
+    
+    def exchange(self, gen, emigrants):
+        '''
+        send emigrants, a list of (individual, fitness), to target islands and wait for
+        the emigrants of generation 'gen' of each source island that is still evolving.
+        Return all immigrants, ordered by source island.
+        '''
+        for outbox in self.outboxes:
+            outbox.put((self.islandIdx, gen, emigrants))
+        #
+        received = self.pending.pop(gen, {})
+        while set(self.sources) - self.finishedSources - set(received.keys()):
+            source, sourceGen, sourceEmigrants = self.inbox.get()
+            if sourceEmigrants is None:
+                self.finishedSources.add(source)
+            elif sourceGen == gen:
+                received[source] = sourceEmigrants
+            else:
+                self.pending[sourceGen][source] = sourceEmigrants
         #
-        return matingInds
+        return [ind for source in sorted(received.keys()) for ind in received[source]]
+    
+    
+    def finish(self):
+        '''
+        tell target islands that this island stops sending emigrants
+        '''
+        for outbox in self.outboxes:
+            outbox.put((self.islandIdx, None, None))
+        return
+
+
+class IslandModel():
+    '''
+    evolve 'numIslands' populations in parallel processes, locally or on other hosts,
+    each by a Simulator, and let the fittest individuals migrate between islands every
+    'migrateEvery' generations. Top fits of all islands are merged into outFile.fit.
+    '''
+    def __init__(self, paramDict, numIslands, migrateEvery=5, numMigrants=2, topology='ring', numTopFitToSave=10, outFile='result', address=None, authkey=None, localIslands=None, simuArgs=None, cacheArgs=None):
+        '''
+        Args:
+            paramDict -- parameter space, see Simulator
+            numIslands -- number of islands
+            migrateEvery -- number of generations between migrations (default:5)
+            numMigrants -- number of fittest individuals each island sends to each of its
+                neighbours per migration (default:2)
+            topology -- 'ring', each island sending to the next one, or 'full', each
+                island sending to all the others (default:'ring')
+            numTopFitToSave, outFile -- see Simulator. Each island saves its own files
+                with prefix outFile.island<index>
+            address -- (host, port) to serve queues of the islands on, so that islands
+                can join from other hosts (default:None, a free port of localhost)
+            authkey -- authentication key of the queue server, required to join the islands
+                from other hosts (default:None, a random key generated by self.evolve(...)
+                and logged for the islands joining from other hosts)
+            localIslands -- number of islands run by local processes, islands with higher
+                indexes join from other hosts via self.joinIsland(...) (default:None, all)
+            simuArgs -- dict of other keyword arguments of Simulator for each island (default:None)
+            cacheArgs -- dict of keyword arguments of FitnessCache for each island, which
+                uses its own dbFile suffixed by the island index (default:None, no caching)
+        '''
+        if topology not in ('ring', 'full'):
+            raise ValueError("Unknown island topology '%s'" % topology)
+        self.paramDict = paramDict
+        self.numIslands = numIslands
+        self.migrateEvery = migrateEvery
+        self.numMigrants = numMigrants
+        self.topology = topology
+        self.numTopFitToSave = numTopFitToSave
+        self.outFile = outFile
+        self.address = address
+        self.authkey = authkey
+        self.localIslands = numIslands if localIslands is None else localIslands
+        self.simuArgs = simuArgs or {}
+        self.cacheArgs = cacheArgs
+        return
+    
+    
+    def evolve(self, numGen, popSize, probCross, probMut, fitnessFunc):
+        '''
+        evolve all islands, see Simulator.evolve(...). Return the populations of all
+        islands concatenated and their fitness values.
+        '''
+        if self.authkey is None:
+            self.authkey = os.urandom(16).encode('hex')
+        manager = IslandManager(self.address or ('127.0.0.1', 0), self.authkey)
+        manager.start()
+        if self.localIslands < self.numIslands:
+            logging.info("Waiting for islands %d-%d to join at %s:%d with authentication key %s" % ((self.localIslands, self.numIslands-1) + tuple(manager.address) + (self.authkey,)))
+        try:
+            islands = []
+            for islandIdx in xrange(self.localIslands):
+                island = multiprocessing.Process(target=self._runIsland, args=(islandIdx, manager.address, numGen, popSize, probCross, probMut, fitnessFunc))
+                island.start()
+                islands.append(island)
+            #
+            results = self._collectResults(manager, islands)
+            for island in islands:
+                island.join()
+        finally:
+            manager.shutdown()
+        
+        # merge top fits and populations of all islands
+        simu = Simulator(self.paramDict, numTopFitToSave=self.numTopFitToSave, outFile=self.outFile, selection=self.simuArgs.get('selection', 'roulette'))
+        pop, fitness = [], []
+        for islandIdx in sorted(results.keys()):
+            topFitness, topPars, islandPop, islandFitness = results[islandIdx]
+            for fit, parDict in zip(topFitness, topPars):
+                simu._updateTopFits(parDict, fit)
+            pop.extend(islandPop)
+            fitness.extend(islandFitness)
+        simu._saveTopFits()
+        simu._saveCurrPop(pop, fitness)
         
+        return pop, fitness
+    
+    
+    def _collectResults(self, manager, islands):
+        '''
+        wait for the results of all islands, checking that local island processes are alive
+        '''
+        resultQueue = manager.getQueue('results')
+        results = {}
+        while len(results) < self.numIslands:
+            try:
+                islandIdx, result = resultQueue.get(timeout=1)
+            except Queue.Empty:
+                if [island for island in islands if island.exitcode not in (None, 0)]:
+                    raise ValueError("An island process exited unexpectedly")
+                continue
+            if isinstance(result, basestring):
+                raise ValueError("Island %d fails: %s" % (islandIdx, result))
+            results[islandIdx] = result
+        return results
+    
+    
+    def joinIsland(self, islandIdx, numGen, popSize, probCross, probMut, fitnessFunc):
+        '''
+        run island 'islandIdx' in this process, joining the islands served at self.address
+        '''
+        if self.authkey is None:
+            raise ValueError("Joining islands requires the authentication key of the host serving them")
+        self._runIsland(islandIdx, self.address, numGen, popSize, probCross, probMut, fitnessFunc)
+        return
+    
+    
+    def _runIsland(self, islandIdx, address, numGen, popSize, probCross, probMut, fitnessFunc):
+        manager = IslandManager(address, self.authkey)
+        manager.connect()
+        resultQueue = manager.getQueue('results')
+        migration = Migration(islandIdx, self.numIslands, self.migrateEvery, self.numMigrants, self.topology, manager)
+        simuArgs = dict(self.simuArgs)
+        # islands forked from one process must not share random number sequences
+        if simuArgs.get('seed') is not None:
+            simuArgs['seed'] = _deriveSeed(simuArgs['seed'], 'island', islandIdx)
+        else:
+            random.seed()
+            if useNumpy:
+                np.random.seed()
+        # each island trains its own surrogate model
+        if simuArgs.get('surrogate') is not None:
+            simuArgs['surrogate'] = copy.deepcopy(simuArgs['surrogate'])
+        #
+        for fileArg in ('statsFile', 'historyFile'):
+            if simuArgs.get(fileArg):
+                root, ext = os.path.splitext(simuArgs[fileArg])
+                simuArgs[fileArg] = '%s.island%d%s' % (root, islandIdx, ext)
+        islandOutFile = '%s.island%d' % (self.outFile, islandIdx)
+        fitnessCache = None
+        if self.cacheArgs is not None:
+            cacheArgs = dict(self.cacheArgs)
+            if cacheArgs.get('dbFile'):
+                cacheArgs['dbFile'] = islandOutFile + '.cache.db'
+            fitnessCache = FitnessCache(**cacheArgs)
+        #
+        try:
+            simu = Simulator(self.paramDict, numTopFitToSave=self.numTopFitToSave, outFile=islandOutFile, fitnessCache=fitnessCache, migration=migration, **simuArgs)
+            pop, fitness = simu.evolve(numGen=numGen, popSize=popSize, probCross=probCross, probMut=probMut, fitnessFunc=fitnessFunc)
+            topFitness, topPars = simu.topFits.sorted()
+            resultQueue.put((islandIdx, (topFitness, topPars, pop, fitness)))
+        except Exception, e:
+            resultQueue.put((islandIdx, str(e)))
+            raise
+        finally:
+            migration.finish()
+            if fitnessCache is not None:
+                fitnessCache.close()
+        return
+    
 
 def createParamCombo(parRange, num):
     '''
@@ -436,12 +3123,12 @@ def parser_argument(parser):
     parser.add_argument('-f', '--fitness_func',
                         type=str,
                         required=True,
-                        help='''Path to *.py file which implements the 'fitnessFunc' to evaluate the fitness of each parameter combination''')
+                        help='''Path to *.py file which implements the 'fitnessFunc' to evaluate the fitness of each parameter combination, 'fitnessFuncBatch' to evaluate a list of parameter combinations at once, or 'fitnessFuncArray' to evaluate numpy arrays of parameter values at once''')
     
     parser.add_argument('-p', '--pop_file',
                         type=str,
                         default=None,
-                        help=''' (optional) Path to *.pop file which will be loaded and used as the ancestral population. If unspecified the program will randomly generate parameter combinations to form the ancestral population''')
+                        help=''' (optional) Path to *.pop file which will be loaded and used as the ancestral population, either in binary population format or pickled by earlier versions. If unspecified the program will randomly generate parameter combinations to form the ancestral population''')
     
     parser.add_argument('-s', '--size',
                         type=int,
@@ -461,7 +3148,49 @@ def parser_argument(parser):
     parser.add_argument('-m', '--mutation',
                         type=float,
                         default=0.05,
-                        help='''Probability of mutation on each variant site, default to 0.05''')
+                        help='''Probability of mutation on each variant site (or of each continuous parameter), default to 0.05''')
+    
+    parser.add_argument('--fidelities',
+                        type=float,
+                        nargs='+',
+                        default=None,
+                        help='''(optional) Increasing fidelity levels of multi-fidelity evaluation, the last one being full fidelity, e.g. 10 30 100 replicates of a stochastic simulation. The fitness function then takes keyword argument 'fidelity', and each generation is evaluated by successive halving: all offspring at the lowest fidelity, then only the best-ranked 1/'--halving' of them at each next fidelity. Offspring with a score in the fitness cache skip the lower fidelities. Only full-fidelity scores enter the *.fit file and the cache''')
+    
+    parser.add_argument('--halving',
+                        type=float,
+                        default=2.,
+                        help='''Reduction factor of the number of offspring re-evaluated at each next fidelity of '--fidelities', default to 2''')
+    
+    parser.add_argument('--rate_schedule',
+                        type=str,
+                        choices=['constant', 'linear', 'exponential'],
+                        default='constant',
+                        help='''Schedule of the probabilities of crossover and mutation, from '--crossover' and '--mutation' at the first generation to '--final_crossover' and '--final_mutation' at the last one, default to constant. The rates in effect are logged in the statistics of each generation''')
+    
+    parser.add_argument('--final_crossover',
+                        type=float,
+                        default=None,
+                        help='''(optional) Probability of crossover at the last generation of '--rate_schedule' ''')
+    
+    parser.add_argument('--final_mutation',
+                        type=float,
+                        default=None,
+                        help='''(optional) Probability of mutation at the last generation of '--rate_schedule' ''')
+    
+    parser.add_argument('--boost_diversity',
+                        type=float,
+                        default=None,
+                        help='''(optional) Multiply the probability of mutation by '--boost' while the fraction of distinct parameter combinations in the population is below this value''')
+    
+    parser.add_argument('--boost',
+                        type=float,
+                        default=2.,
+                        help='''Factor of the diversity-triggered mutation boost, default to 2''')
+    
+    parser.add_argument('--self_adaptive',
+                        default=False,
+                        action='store_true',
+                        help='''Let each individual carry its own factor of the probability of mutation, inherited from its parents with a log-normal perturbation, so that mutation rates adapt through selection''')
     
     parser.add_argument('-n', '--num_topfit',
                         type=int,
@@ -483,6 +3212,184 @@ def parser_argument(parser):
                         default=None,
                         help='''(optional) Save top-fit parameters to table named by '--table_name' of the SQL database, *.db file. Leave it unspecified to skip this step''')
     
+    parser.add_argument('-w', '--workers',
+                        type=int,
+                        default=1,
+                        help='''Number of worker processes to evaluate fitness of each generation in parallel, default to 1 (serial)''')
+    
+    parser.add_argument('--concurrency',
+                        type=int,
+                        default=1,
+                        help='''Number of threads evaluating fitness concurrently, for fitness functions that mostly wait on external programs or servers. A batch fitness function ('fitnessFuncBatch') is called concurrently on this many chunks of each generation. Default to 1''')
+    
+    parser.add_argument('--cache',
+                        default=False,
+                        action='store_true',
+                        help='''Memoize fitness values so that each parameter combination is evaluated only once. Not supported by array fitness functions ('fitnessFuncArray')''')
+    
+    parser.add_argument('--cache_size',
+                        type=int,
+                        default=0,
+                        help='''Max number of memoized fitness values kept in memory (least recently used ones are dropped first), default to 0 (unbounded)''')
+    
+    parser.add_argument('--cache_db',
+                        default=False,
+                        action='store_true',
+                        help='''Persist memoized fitness values to *.cache.db file named by '--out_prefix', so that a resumed run or a rerun never evaluates a parameter combination twice. The file records a fingerprint of the fitness function (its source file, name and full fidelity), and is cleared if the fitness function has changed. Implies '--cache' ''')
+    
+    parser.add_argument('--engine',
+                        type=str,
+                        choices=['string', 'numpy'],
+                        default='string',
+                        help='''Genome engine, 'string' to store individuals as binary strings or 'numpy' to store the population as a numpy array with vectorized crossover and mutation (requires numpy), default to 'string' ''')
+    
+    parser.add_argument('--selection',
+                        type=str,
+                        choices=['roulette', 'tournament', 'rank', 'sus', 'nsga2'],
+                        default='roulette',
+                        help='''Strategy to choose mating individuals: 'roulette' wheel weighted by reciprocal fitness, 'tournament', linear 'rank', stochastic universal sampling 'sus' (weighted as 'roulette', requiring positive fitness), or 'nsga2' for fitness functions returning a tuple of objectives (non-dominated sorting and crowding distance, saving the Pareto front to *.fit file), default to 'roulette' ''')
+    
+    parser.add_argument('--tournament_size',
+                        type=int,
+                        default=2,
+                        help='''Number of individuals competing in each tournament of '--selection tournament', default to 2''')
+    
+    parser.add_argument('--elite',
+                        type=int,
+                        default=0,
+                        help='''Number of fittest individuals copied to the next generation without re-evaluation, default to 0''')
+    
+    parser.add_argument('--replace_frac',
+                        type=float,
+                        default=1.0,
+                        help='''Fraction of population replaced by offspring per generation. Set it below 1 for steady-state evolution, in which the fittest of the rest survive, default to 1.0''')
+    
+    parser.add_argument('--sbx_eta',
+                        type=float,
+                        default=15.,
+                        help='''Distribution index of simulated binary crossover of continuous parameters, larger values keep offspring closer to their parents, default to 15''')
+    
+    parser.add_argument('--mut_sigma',
+                        type=float,
+                        default=0.1,
+                        help='''Standard deviation of Gaussian mutation of continuous parameters, relative to their range, default to 0.1''')
+    
+    parser.add_argument('--local_search',
+                        type=int,
+                        default=0,
+                        help='''(optional) Run memetic local search every this many generations: the '--local_search_size' fittest individuals hill-climb over neighbouring values (one step up or down the list of values of each parameter, or '--mut_sigma' of the range of a continuous parameter), evaluated in batches, and improved ones replace them in the population. Default to 0, no local search. Requires numpy''')
+    
+    parser.add_argument('--local_search_size',
+                        type=int,
+                        default=1,
+                        help='''Number of fittest individuals refined by each local search, default to 1''')
+    
+    parser.add_argument('--local_search_steps',
+                        type=int,
+                        default=10,
+                        help='''Max number of hill-climbing steps of each local search, default to 10''')
+    
+    parser.add_argument('--resume',
+                        default=False,
+                        action='store_true',
+                        help='''Resume evolving from the checkpoint file *.ckpt named by '--out_prefix', which is saved along with the population and top fits every 'save_at' generations''')
+    
+    parser.add_argument('--stats_file',
+                        type=str,
+                        default=None,
+                        help='''(optional) File to stream per-generation statistics to (fitness, diversity, evaluations, cache hits and seconds spent in each phase), in CSV format if its name ends with '.csv' or else in JSON lines''')
+    
+    parser.add_argument('--seed',
+                        type=int,
+                        default=None,
+                        help='''(optional) Seed of random number generators. Runs with the same seed and options give identical results, whatever the number of workers, if the fitness function is deterministic (see '--seed_fitness' otherwise). Each island draws from its own sub-stream of the seed''')
+    
+    parser.add_argument('--seed_fitness',
+                        default=False,
+                        action='store_true',
+                        help='''Seed the global random and numpy.random generators with a sub-stream of '--seed' before each call of the fitness function, in the main or a worker process, so that runs of a stochastic fitness function are reproduced whatever the number of workers. Batch and array fitness functions get one sub-stream per call, and threads of '--concurrency' are not seeded''')
+    
+    parser.add_argument('--surrogate',
+                        type=float,
+                        default=None,
+                        help='''(optional) Oversampling factor of offspring pre-screened by a k-nearest-neighbour surrogate model of fitness, trained on every evaluated individual: this many times as many offspring as needed are bred each generation and only the ones of the best predicted fitness are evaluated, e.g. 2 to evaluate the best half. Its prediction error is added to the statistics of each generation. Requires numpy''')
+    
+    parser.add_argument('--surrogate_k',
+                        type=int,
+                        default=5,
+                        help='''Number of nearest evaluated individuals averaged by the surrogate model, default to 5''')
+    
+    parser.add_argument('--history_db',
+                        default=False,
+                        action='store_true',
+                        help='''Stream every evaluated individual (generation, parameter values and fitness) to table 'history' of *.history.db sqlite file named by '--out_prefix', indexed on fitness and generation, which can be queried while the program is running''')
+    
+    parser.add_argument('--stop_stagnation',
+                        type=int,
+                        default=None,
+                        help='''(optional) Stop evolving early if the best fitness has not improved for this many generations''')
+    
+    parser.add_argument('--stop_fitness',
+                        type=float,
+                        default=None,
+                        help='''(optional) Stop evolving early once a fitness value no greater than this target is found (for multiple objectives, once every objective reaches it)''')
+    
+    parser.add_argument('--stop_time',
+                        type=float,
+                        default=None,
+                        help='''(optional) Stop evolving early once this many seconds have elapsed''')
+    
+    parser.add_argument('--stop_evals',
+                        type=int,
+                        default=None,
+                        help='''(optional) Stop evolving early once the fitness function has been called this many times, counting calls below full fidelity of '--fidelities' as fractions (e.g. a call at fidelity 10 of 100 as 0.1)''')
+    
+    parser.add_argument('--stop_diversity',
+                        type=float,
+                        default=None,
+                        help='''(optional) Stop evolving early once the fraction of distinct parameter combinations in the population drops below this value''')
+    
+    parser.add_argument('--islands',
+                        type=int,
+                        default=1,
+                        help='''Number of islands, i.e. populations evolving in parallel processes with periodic migration of their fittest individuals, default to 1 (a single population)''')
+    
+    parser.add_argument('--migrate_every',
+                        type=int,
+                        default=5,
+                        help='''Number of generations between migrations among islands, default to 5''')
+    
+    parser.add_argument('--migrants',
+                        type=int,
+                        default=2,
+                        help='''Number of fittest individuals each island sends to each of its neighbours per migration, default to 2''')
+    
+    parser.add_argument('--topology',
+                        type=str,
+                        choices=['ring', 'full'],
+                        default='ring',
+                        help='''Migration topology, 'ring' (each island sends to the next one) or 'full' (each island sends to all the others), default to 'ring' ''')
+    
+    parser.add_argument('--island_address',
+                        type=str,
+                        default=None,
+                        help='''(optional) HOST:PORT to serve migration queues on, or to connect to with '--island_id'. Default to a free port of localhost''')
+    
+    parser.add_argument('--island_authkey',
+                        type=str,
+                        default=None,
+                        help='''(optional) Authentication key of the migration queue server, required with '--island_id'. Default to a random key, which is printed for the islands joining from other hosts''')
+    
+    parser.add_argument('--local_islands',
+                        type=int,
+                        default=None,
+                        help='''(optional) Number of islands run on this host. Islands with higher indexes join from other hosts by running the same command with '--island_address' and '--island_id'. Default to all islands''')
+    
+    parser.add_argument('--island_id',
+                        type=int,
+                        default=None,
+                        help='''(optional) Join the islands served at '--island_address' as the island of this index''')
+    
     parser.add_argument('--debug',
                         default=False,
                         action='store_true',
@@ -511,6 +3418,9 @@ def parseConfigFile(configFile):
         
         if len(tmp) == 1:  # if exact value(s)
             paramDict[par] = eval(tmp[0])
+            # continuous parameter within (lower, upper)
+            if type(paramDict[par]) is tuple and len(paramDict[par]) == 2 and all([type(i) in (int, long, float) for i in paramDict[par]]):
+                paramDict[par] = ContinuousParam(*paramDict[par])
         else:   # range -> values
             paramDict[par] = createParamCombo(eval(tmp[0]), eval(tmp[1]))
     
@@ -521,7 +3431,17 @@ def main_func(args):
 
     paramDict = parseConfigFile(args.config_file)
     
-    fitnessFunc = imp.load_source('fitnessFunc', args.fitness_func).fitnessFunc
+    # use the array fitness function 'fitnessFuncArray' or the batch fitness function
+    # 'fitnessFuncBatch' if the fitness module implements it
+    fitnessModule = imp.load_source('fitnessFunc', args.fitness_func)
+    arrayFitness = hasattr(fitnessModule, 'fitnessFuncArray')
+    batchFitness = not arrayFitness and hasattr(fitnessModule, 'fitnessFuncBatch')
+    if arrayFitness:
+        fitnessFunc = fitnessModule.fitnessFuncArray
+    elif batchFitness:
+        fitnessFunc = fitnessModule.fitnessFuncBatch
+    else:
+        fitnessFunc = fitnessModule.fitnessFunc
     
     initPopFile = args.pop_file
     
@@ -535,10 +3455,54 @@ def main_func(args):
     
     out_prefix = args.out_prefix
     table_name = args.table_name
+    workers = args.workers
+    
+    if args.seed_fitness and args.seed is None:
+        logging.warning("Seeding the fitness function requires '--seed', ignore option of seed_fitness")
+    
+    cacheArgs = None
+    if (args.cache or args.cache_db) and arrayFitness:
+        logging.warning("Array fitness function is evaluated on the whole population in a single call per generation, ignore options of cache")
+    elif args.cache or args.cache_db:
+        cacheArgs = {'maxSize': args.cache_size, 'dbFile': out_prefix+'.cache.db' if args.cache_db else None}
     
-    # run evolution
-    simu = Simulator(paramDict, numTopFitToSave=numTopFitToSave, saveAt=saveAt, initPopFile=initPopFile, outFile=out_prefix)
-    tmp = simu.evolve(numGen=numGen, popSize=popSize, probCross=probCross, probMut=probMut, fitnessFunc=fitnessFunc)
+    surrogate = KNNSurrogate(k=args.surrogate_k, oversample=args.surrogate) if args.surrogate else None
+    
+    # fidelity levels passed to the fitness function as integers where possible, e.g. numbers of replicates
+    fidelities = [int(fidelity) if fidelity == int(fidelity) else fidelity for fidelity in args.fidelities] if args.fidelities else None
+    
+    adaptiveRates = None
+    if args.rate_schedule != 'constant' or args.boost_diversity is not None or args.self_adaptive:
+        adaptiveRates = AdaptiveRates(schedule=args.rate_schedule, finalCross=args.final_crossover, finalMut=args.final_mutation, minDiversity=args.boost_diversity, boost=args.boost, selfAdaptive=args.self_adaptive)
+    
+    stopCriteria = StopCriteria(stagnation=args.stop_stagnation, targetFitness=args.stop_fitness, timeLimit=args.stop_time, maxEvals=args.stop_evals, minDiversity=args.stop_diversity)
+    
+    simuArgs = dict(saveAt=saveAt, initPopFile=initPopFile, workers=workers, engine=args.engine, selection=args.selection, tournamentSize=args.tournament_size, elite=args.elite, replaceFrac=args.replace_frac, concurrency=args.concurrency, batchFitness=batchFitness, arrayFitness=arrayFitness, statsFile=args.stats_file, stopCriteria=stopCriteria, sbxEta=args.sbx_eta, mutSigma=args.mut_sigma, historyFile=out_prefix+'.history.db' if args.history_db else None, seed=args.seed, seedFitness=args.seed_fitness, surrogate=surrogate, localSearchEvery=args.local_search, localSearchSize=args.local_search_size, localSearchSteps=args.local_search_steps, adaptiveRates=adaptiveRates, fidelities=fidelities, halving=args.halving)
+    
+    # run evolution on islands (optional)
+    if args.islands > 1 or args.island_id is not None:
+        if args.resume:
+            raise ValueError("Option '--resume' is not supported by the island model")
+        address = None
+        if args.island_address:
+            host, port = args.island_address.rsplit(':', 1)
+            address = (host, int(port))
+        islandModel = IslandModel(paramDict, args.islands, migrateEvery=args.migrate_every, numMigrants=args.migrants, topology=args.topology, numTopFitToSave=numTopFitToSave, outFile=out_prefix, address=address, authkey=args.island_authkey, localIslands=args.local_islands, simuArgs=simuArgs, cacheArgs=cacheArgs)
+        if args.island_id is not None:
+            if address is None:
+                raise ValueError("Option '--island_id' requires '--island_address' of the islands to join")
+            islandModel.joinIsland(args.island_id, numGen=numGen, popSize=popSize, probCross=probCross, probMut=probMut, fitnessFunc=fitnessFunc)
+            return
+        tmp = islandModel.evolve(numGen=numGen, popSize=popSize, probCross=probCross, probMut=probMut, fitnessFunc=fitnessFunc)
+    
+    else:
+        fitnessCache = FitnessCache(**cacheArgs) if cacheArgs is not None else None
+        simu = Simulator(paramDict, numTopFitToSave=numTopFitToSave, outFile=out_prefix, fitnessCache=fitnessCache, resume=args.resume, **simuArgs)
+        try:
+            tmp = simu.evolve(numGen=numGen, popSize=popSize, probCross=probCross, probMut=probMut, fitnessFunc=fitnessFunc)
+        finally:
+            if fitnessCache is not None:
+                fitnessCache.close()
     
     # save results to db (optional)
     if table_name:  
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+
+'''
+Purpose: Benchmarks of genetic algorithm operators and end-to-end evolve throughput
+
+Description: times initPop, selection, crossover, mutation, decoding, fitness
+evaluation overhead (with a trivial fitness function), saving of top fits and
+population, and generations per second of Simulator.evolve, across population
+sizes, numbers of parameters and chromosome lengths, for each genome engine.
+Random seeds are fixed, while the fitness function is not seeded per evaluation
+(see option '--seed_fitness' of GeneticAlgorithm.py). Results are written as JSON
+lines, or CSV if the output file name ends with '.csv'.
+
+Run >> python benchmark.py -h
+'''
+
+import os, sys, shutil, tempfile, timeit
+import argparse, json, csv, itertools
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import GeneticAlgorithm as GA
+
+
+def trivialFitness(parDict):
+    return 1. + parDict['p0']
+
+
+def trivialFitnessArray(columns):
+    return 1. + columns['p0']
+
+
+def makeParamDict(numPars, lenChr):
+    '''
+    parameter space of 'numPars' variable parameters, each with 2^lenChr values, and one fixed parameter
+    '''
+    paramDict = dict(('p%d' % idx, range(2**lenChr)) for idx in xrange(numPars))
+    paramDict['fixed'] = 1.
+    return paramDict
+
+
+def bestTime(func, repeat):
+    '''
+    best wall time in seconds of 'repeat' calls of func
+    '''
+    times = []
+    for num in xrange(repeat):
+        startTime = timeit.default_timer()
+        func()
+        times.append(timeit.default_timer() - startTime)
+    return min(times)
+
+
+def benchOperators(engine, popSize, numPars, lenChr, probCross, probMut, repeat, outDir):
+    '''
+    yield (benchmark name, seconds) of each operator on one generation of 'popSize' individuals
+    '''
+    paramDict = makeParamDict(numPars, lenChr)
+    simu = GA.Simulator(paramDict, numTopFitToSave=100, outFile=os.path.join(outDir, 'bench'), engine=engine, seed=0)
+    varParamDict, fixParamDict = simu.diffParamType(paramDict)
+
+    if engine == 'numpy':
+        genome = simu.genome = GA.GenomeArray(varParamDict, rng=simu.npRng)
+        yield 'initPop', bestTime(lambda: genome.random(popSize), repeat)
+        pop = genome.random(popSize)
+    else:
+        yield 'initPop', bestTime(lambda: simu.initPop(varParamDict, popSize), repeat)
+        pop = simu.initPop(varParamDict, popSize)
+    fitness = simu.evalPopFitness(pop, fixParamDict, trivialFitness)
+
+    for selection in ('roulette', 'tournament', 'rank', 'sus'):
+        simu.selection = selection
+        yield 'selection_' + selection, bestTime(lambda: simu._chooseMatingIdxes(fitness, popSize), repeat)
+    simu.selection = 'roulette'
+
+    idxes = simu._chooseMatingIdxes(fitness, popSize - popSize % 2)
+    if engine == 'numpy':
+        yield 'crossover', bestTime(lambda: genome.crossover(pop[idxes[0::2]], pop[idxes[1::2]], probCross), repeat)
+        yield 'mutation', bestTime(lambda: genome.mutate(pop.copy(), probMut), repeat)
+        yield 'decode', bestTime(lambda: genome.decode(pop), repeat)
+    else:
+        pairs = [[pop[idxes[idx]], pop[idxes[idx+1]]] for idx in xrange(0, len(idxes), 2)]
+        yield 'crossover', bestTime(lambda: [simu.crossover(parents, probCross) for parents in pairs], repeat)
+        yield 'mutation', bestTime(lambda: simu.mutation([dict(ind) for ind in pop], probMut), repeat)
+        yield 'decode', bestTime(lambda: [simu._convertBinToPar(ind) for ind in pop], repeat)
+
+    yield 'evalFitness', bestTime(lambda: simu.evalPopFitness(pop, fixParamDict, trivialFitness), repeat)
+    if GA.useNumpy:
+        simu.arrayFitness, simu.columnGenome = True, simu.genome or GA.GenomeArray(varParamDict)
+        yield 'evalFitnessArray', bestTime(lambda: simu.evalPopFitness(pop, fixParamDict, trivialFitnessArray), repeat)
+        simu.arrayFitness = False
+
+    yield 'saveTopFits', bestTime(simu._saveTopFits, repeat)
+    yield 'saveCurrPop', bestTime(lambda: simu._saveCurrPop(pop), repeat)
+    return
+
+
+def benchEvolve(engine, popSize, numPars, lenChr, probCross, probMut, numGen, outDir):
+    '''
+    generations per second of Simulator.evolve(...), excluding the ancestral generation
+    '''
+    simu = GA.Simulator(makeParamDict(numPars, lenChr), numTopFitToSave=100, saveAt=numGen, outFile=os.path.join(outDir, 'evolve'), engine=engine, seed=0)
+    genTimes = []
+    simu.onGeneration = lambda stats: genTimes.append(stats['time_total']) if stats['gen'] > 0 else None
+    simu.evolve(numGen=numGen, popSize=popSize, probCross=probCross, probMut=probMut, fitnessFunc=trivialFitness)
+    return len(genTimes) / sum(genTimes)
+
+
+def main_func(args):
+    engines = ['string', 'numpy'] if GA.useNumpy else ['string']
+    if args.engine:
+        engines = [args.engine]
+
+    outFile = open(args.out_file, 'w') if args.out_file else sys.stdout
+    writer = None
+    outDir = tempfile.mkdtemp(prefix='genetalgo_bench_')
+    try:
+        for engine, popSize, numPars, lenChr in itertools.product(engines, args.pop_sizes, args.num_pars, args.len_chr):
+            config = [('engine', engine), ('popSize', popSize), ('numPars', numPars), ('lenChr', lenChr)]
+            records = [config + [('benchmark', name), ('seconds', seconds)] for name, seconds in benchOperators(engine, popSize, numPars, lenChr, args.crossover, args.mutation, args.repeat, outDir)]
+            gensPerSec = benchEvolve(engine, popSize, numPars, lenChr, args.crossover, args.mutation, args.gen, outDir)
+            records.append(config + [('benchmark', 'evolve'), ('seconds', 1. / gensPerSec), ('gensPerSecond', gensPerSec)])
+            #
+            for record in records:
+                record = dict(record)
+                if args.out_file and args.out_file.endswith('.csv'):
+                    if writer is None:
+                        writer = csv.DictWriter(outFile, ['engine', 'popSize', 'numPars', 'lenChr', 'benchmark', 'seconds', 'gensPerSecond'])
+                        writer.writeheader()
+                    writer.writerow(record)
+                else:
+                    outFile.write(json.dumps(record, sort_keys=True) + '\n')
+                outFile.flush()
+    finally:
+        shutil.rmtree(outDir, ignore_errors=True)
+        if args.out_file:
+            outFile.close()
+    return
+
+
+def parser_argument(parser):
+    parser.add_argument('-s', '--pop_sizes',
+                        type=int,
+                        nargs='+',
+                        default=[100, 1000],
+                        help='''Population sizes to benchmark, default to 100 1000''')
+
+    parser.add_argument('-p', '--num_pars',
+                        type=int,
+                        nargs='+',
+                        default=[4, 16],
+                        help='''Numbers of variable parameters to benchmark, default to 4 16''')
+
+    parser.add_argument('-l', '--len_chr',
+                        type=int,
+                        nargs='+',
+                        default=[4, 8],
+                        help='''Chromosome lengths (bits per parameter) to benchmark, default to 4 8''')
+
+    parser.add_argument('-e', '--engine',
+                        type=str,
+                        choices=['string', 'numpy'],
+                        default=None,
+                        help='''(optional) Genome engine to benchmark, default to all available engines''')
+
+    parser.add_argument('-g', '--gen',
+                        type=int,
+                        default=5,
+                        help='''Number of generations to evolve for the end-to-end benchmark, default to 5''')
+
+    parser.add_argument('-r', '--crossover',
+                        type=float,
+                        default=0.5,
+                        help='''Probability of crossover during each mating event, default to 0.5''')
+
+    parser.add_argument('-m', '--mutation',
+                        type=float,
+                        default=0.05,
+                        help='''Probability of mutation on each variant site, default to 0.05''')
+
+    parser.add_argument('-n', '--repeat',
+                        type=int,
+                        default=3,
+                        help='''Number of repeats of each operator benchmark, the best time is reported, default to 3''')
+
+    parser.add_argument('-o', '--out_file',
+                        type=str,
+                        default=None,
+                        help='''(optional) File to write results to, in CSV format if its name ends with '.csv' or else in JSON lines. Default to the standard output''')
+
+
+if __name__ == '__main__':
+
+    master_parser = argparse.ArgumentParser(
+        description = '''Benchmarks of genetic algorithm operators and evolve throughput.
+        ''',
+        prog = 'genetalgo-benchmark',
+    )
+    parser_argument(master_parser)
+    master_parser.set_defaults(func=main_func)
+
+    args = master_parser.parse_args()
+    args.func(args)
+
+    sys.exit()